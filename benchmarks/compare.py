@@ -0,0 +1,79 @@
+"""
+Сравнение двух отчетов benchmarks.run: изменения p50/p95/p99 и rps по сценариям.
+Код выхода 1, если p95/p99 выросли или rps упал больше чем на --threshold процентов —
+удобно для проверки регрессий в CI.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+
+# метрика -> больше значит хуже?
+METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "rps": False}
+# по этим метрикам считаем регрессию (p50 шумный и почти всегда из кэша)
+GATED = ("p95_ms", "p99_ms", "rps")
+
+
+def change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    rows = []
+    names = list(base["endpoints"]) + [n for n in new["endpoints"] if n not in base["endpoints"]]
+    for name in names + ["TOTAL"]:
+        b = base["total"] if name == "TOTAL" else base["endpoints"].get(name)
+        a = new["total"] if name == "TOTAL" else new["endpoints"].get(name)
+        if not b or not a:
+            rows.append((name, None, []))
+            continue
+        deltas, regressions = {}, []
+        for metric, higher_is_worse in METRICS.items():
+            pct = change(b[metric], a[metric])
+            deltas[metric] = (b[metric], a[metric], pct)
+            worse = pct > threshold if higher_is_worse else pct < -threshold
+            if metric in GATED and worse:
+                regressions.append(metric)
+        rows.append((name, deltas, regressions))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=10.0, help="allowed change, percent")
+    args = ap.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    for label, report in (("base", base), ("new", new)):
+        m = report["meta"]
+        print(f"{label}: {m.get('git_commit') or '?'} {m['dialect']} {m['engines_rows']} rows, "
+              f"concurrency {m['concurrency']}, cache {m.get('cache_backend')}")
+    if (base["meta"]["dialect"], base["meta"]["engines_rows"], base["meta"]["concurrency"]) != \
+            (new["meta"]["dialect"], new["meta"]["engines_rows"], new["meta"]["concurrency"]):
+        print("WARNING: runs differ in database, dataset size or concurrency")
+
+    print(f"{'scenario':24} " + " ".join(f"{m:>24}" for m in METRICS))
+    regressed = False
+    for name, deltas, regressions in compare(base, new, args.threshold):
+        if deltas is None:
+            print(f"{name:24} (only in one report)")
+            continue
+        cells = " ".join(f"{b:9.2f} -> {a:9.2f} {pct:+5.0f}%" for b, a, pct in deltas.values())
+        flag = "  REGRESSION: " + ", ".join(regressions) if regressions else ""
+        print(f"{name:24} {cells}{flag}")
+        regressed = regressed or bool(regressions)
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Синтетический каталог для бенчмарков: engines + engine_images (+ engine_oems, price_stats)
+с перекосом как в реальных данных — несколько марок дают большую часть товаров,
+у марки пара ходовых моделей, годы кучкуются вокруг середины 2000-х.
+
+    python -m benchmarks.generate --size 100k --db            # прямо в DATABASE_URL (SQLite или Postgres)
+    python -m benchmarks.generate --size 1m --csv /tmp/bench  # csv для load_csv.py (быстрее для Postgres)
+
+Размеры: 10k, 100k, 1m (или число). Данные детерминированы по --seed.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import time
+from typing import Iterator, List, Tuple
+
+from core.normalize import derived_fields, split_oem
+from json_to_csv import ENGINES_CSV, IMAGES_CSV, ENGINE_FIELDS
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# марка -> модели; порядок = популярность (вес по Ципфу)
+CATALOG = {
+    "Toyota": ["Corolla", "Camry", "Mark II", "Land Cruiser", "RAV4", "Crown", "Prius", "Hiace", "Vitz", "Harrier"],
+    "Nissan": ["X-Trail", "Skyline", "Almera", "Primera", "Teana", "Note", "Patrol", "Qashqai"],
+    "Honda": ["Civic", "Accord", "CR-V", "Fit", "Stepwgn", "Odyssey"],
+    "Mitsubishi": ["Lancer", "Pajero", "Outlander", "Galant", "Delica"],
+    "Mazda": ["Mazda3", "Mazda6", "Demio", "CX-5", "MPV"],
+    "Subaru": ["Forester", "Legacy", "Impreza", "Outback"],
+    "Suzuki": ["Grand Vitara", "Swift", "Jimny", "SX4"],
+    "Hyundai": ["Solaris", "Santa Fe", "Tucson", "Accent"],
+    "Kia": ["Rio", "Sportage", "Sorento", "Cerato"],
+    "Lexus": ["RX", "GS", "LX", "IS"],
+    "Volkswagen": ["Passat", "Golf", "Tiguan", "Touareg"],
+    "BMW": ["X5", "3 Series", "5 Series"],
+    "Mercedes-Benz": ["E-Class", "C-Class", "ML"],
+    "Audi": ["A6", "A4", "Q7"],
+    "Isuzu": ["Bighorn", "Elf"],
+    "Daihatsu": ["Terios", "Move"],
+}
+ENGINE_CODES = ["1JZ-GTE", "2JZ-GE", "1NZ-FE", "2AZ-FE", "1MZ-FE", "QR25DE", "SR20DET", "VQ35DE", "K24A",
+                "D16A", "4G63", "4B11", "FS-DE", "LF-VE", "EJ20", "EJ25", "M13A", "G4FC", "D4CB", "1KD-FTV"]
+ENGINE_TYPES = ["бензиновый", "дизельный", "гибрид", None]
+STOCK = ["В наличии", "Под заказ", "Нет в наличии"]
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1 / (i + 1) ** s for i in range(n)]
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def generate(n: int, seed: int = 1) -> Iterator[Tuple[dict, List[str]]]:
+    """(строка engines с полями ENGINE_FIELDS, список url картинок) для product_id 1..n."""
+    rnd = random.Random(seed)
+    makes = list(CATALOG)
+    make_weights = zipf_weights(len(makes))
+    model_weights = {m: zipf_weights(len(models), 1.3) for m, models in CATALOG.items()}
+
+    for pid in range(1, n + 1):
+        make = rnd.choices(makes, make_weights)[0]
+        model = rnd.choices(CATALOG[make], model_weights[make])[0]
+        # годы кучкуются вокруг 2007, у части товаров есть месяц, у части год не указан
+        year_num = min(max(int(rnd.gauss(2007, 5)), 1988), 2024)
+        r = rnd.random()
+        year = None if r < 0.08 else f"{rnd.randint(1, 12):02d}.{year_num}" if r < 0.6 else str(year_num)
+        code = rnd.choice(ENGINE_CODES)
+        oems = [f"19000-{rnd.randint(10000, 99999)}" for _ in range(rnd.choices([0, 1, 2, 3], [2, 6, 2, 1])[0])]
+        price = None if rnd.random() < 0.05 else int(rnd.lognormvariate(11, 0.6)) // 100 * 100
+
+        row = {
+            "product_id": pid,
+            "title": f"Двигатель {make} {model} {code}",
+            "make": None if rnd.random() < 0.01 else make,
+            "model": model,
+            "year": year,
+            "engine_code": code,
+            "engine_type": rnd.choice(ENGINE_TYPES),
+            "price": price,
+            "currency": "RUB",
+            "stock_text": rnd.choice(STOCK),
+            "oem": ", ".join(oems) or None,
+            "description": f"Контрактный двигатель {code} для {make} {model}, пробег {rnd.randint(30, 250)} тыс. км.",
+        }
+        images = [f"https://img.example.com/{pid}/{i}.jpg" for i in range(rnd.choices(range(9), [1, 2, 3, 4, 4, 3, 2, 1, 1])[0])]
+        yield row, images
+
+
+def write_csv(n: int, out_dir: str, seed: int = 1):
+    # тот же формат, что у json_to_csv.py — дальше python load_csv.py --engines ... --images ...
+    os.makedirs(out_dir, exist_ok=True)
+    engines_path, images_path = os.path.join(out_dir, ENGINES_CSV), os.path.join(out_dir, IMAGES_CSV)
+    with open(engines_path, "w", newline="", encoding="utf-8") as fe, \
+            open(images_path, "w", newline="", encoding="utf-8") as fi:
+        we = csv.DictWriter(fe, fieldnames=ENGINE_FIELDS)
+        wi = csv.writer(fi)
+        we.writeheader()
+        wi.writerow(["product_id", "image_url", "sort_order"])
+        for row, images in generate(n, seed):
+            we.writerow(row)
+            for idx, url in enumerate(images):
+                wi.writerow([row["product_id"], url, idx])
+    print(f"OK: {engines_path}, {images_path}")
+
+
+async def write_db(n: int, seed: int = 1, batch_size: int = 5000):
+    # в текущий DATABASE_URL: схема создается, таблицы каталога очищаются
+    from sqlalchemy import delete, insert
+
+    from dao.catalog_dao import catalog_dao
+    from dao.stats_dao import stats_dao
+    from db.database import engine, async_session
+    from db.models import Engine, EngineImage, EngineOem, PriceStat
+    from db.schema import create_schema
+
+    await create_schema()
+    async with async_session() as session:
+        for model in (PriceStat, EngineOem, EngineImage, Engine):
+            await session.execute(delete(model))
+
+        engines, images, oems = [], [], []
+
+        async def flush():
+            if engines:
+                await session.execute(insert(Engine), engines)
+            if images:
+                await session.execute(insert(EngineImage), images)
+            if oems:
+                await session.execute(insert(EngineOem), oems)
+            engines.clear(), images.clear(), oems.clear()
+
+        for row, urls in generate(n, seed):
+            engines.append({**row, **derived_fields(row)})
+            images.extend({"product_id": row["product_id"], "image_url": u, "sort_order": i} for i, u in enumerate(urls))
+            oems.extend({"product_id": row["product_id"], "oem_norm": k} for k in split_oem(row["oem"]))
+            if len(engines) >= batch_size:
+                await flush()
+        await flush()
+
+        await stats_dao.rebuild(session)
+        generation = await catalog_dao.bump_generation(session)
+        await session.commit()
+    await engine.dispose()
+    print(f"OK: {n} engines in {engine.url.render_as_string(hide_password=True)}, catalog generation {generation}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size", default="10k", help="10k, 100k, 1m or a number of engines")
+    ap.add_argument("--seed", type=int, default=1)
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", action="store_true", help="write into DATABASE_URL")
+    target.add_argument("--csv", metavar="DIR", help="write engines.csv / engine_images.csv into DIR")
+    args = ap.parse_args()
+
+    n = parse_size(args.size)
+    started = time.perf_counter()
+    if args.csv:
+        write_csv(n, args.csv, args.seed)
+    else:
+        asyncio.run(write_db(n, args.seed))
+    print(f"generated {n} engines in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
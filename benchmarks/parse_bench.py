@@ -0,0 +1,95 @@
+"""
+Микро-бенчмарк разбора карточки товара: старый путь (два парсинга HTML,
+поиск по дереву на каждую метку, два get_text) против parse_product.
+
+    python -m benchmarks.parse_bench [--pages benchmarks/fixtures] [--seconds 3]
+"""
+import argparse
+import glob
+import os
+import time
+from dataclasses import asdict
+
+from bs4 import BeautifulSoup
+
+from scraper.sources import mysakura
+from scraper.items import EngineItem
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_images(html: str) -> list:
+    # extract_images_from_html до оптимизации: свой парсинг и CSS-селектор через soupsieve
+    soup = BeautifulSoup(html, "lxml")
+    for bad in soup.select(".slider_additional_parts, .additional_parts, .product__wrapper .row.slider_additional_parts"):
+        bad.decompose()
+    return mysakura.extract_images(soup)
+
+
+def legacy_parse(html: str, url: str) -> EngineItem:
+    # как scrape_product разбирал страницу до однопроходного парсера
+    soup = BeautifulSoup(html, "lxml")
+    title = mysakura.extract_title(soup)
+    engine_code = mysakura.extract_field_from_specs(soup, "Двигатель")
+    return EngineItem(
+        source="mysakura",
+        source_url=url,
+        product_id=mysakura.extract_product_id(url),
+        title=title,
+        make=mysakura.extract_field_from_specs(soup, "Марка"),
+        model=mysakura.extract_field_from_specs(soup, "Модель"),
+        year=mysakura.extract_field_from_specs(soup, "Год"),
+        engine_code=engine_code,
+        engine_type=mysakura.guess_engine_type(engine_code, title),
+        price=mysakura.extract_price(soup),
+        currency="RUB",
+        stock_text=mysakura.extract_field_from_specs(soup, "Наличие"),
+        oem=mysakura.extract_field_from_specs(soup, "OEM"),
+        description=mysakura.extract_description(soup),
+        images=legacy_images(html),
+    )
+
+
+def pages_per_second(fn, pages, seconds: float) -> float:
+    done, started = 0, time.perf_counter()
+    while True:
+        for url, html in pages:
+            fn(html, url)
+        done += len(pages)
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return done / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", default=FIXTURES, help="directory with saved product pages (*.html)")
+    ap.add_argument("--seconds", type=float, default=3.0, help="time budget per variant")
+    args = ap.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        pid = name.rsplit("_", 1)[-1]
+        with open(path, encoding="utf-8") as f:
+            pages.append((f"{mysakura.BASE}/product/{pid}", f.read()))
+    if not pages:
+        raise SystemExit(f"no *.html pages in {args.pages}")
+
+    # сначала убеждаемся, что оба пути дают одно и то же
+    for url, html in pages:
+        old, new = asdict(legacy_parse(html, url)), asdict(mysakura.parse_product(html, url))
+        if old != new:
+            diff = {k: (old[k], new[k]) for k in old if old[k] != new[k]}
+            raise SystemExit(f"results differ for {url}: {diff}")
+
+    before = pages_per_second(legacy_parse, pages, args.seconds)
+    after = pages_per_second(mysakura.parse_product, pages, args.seconds)
+    print(f"pages: {len(pages)} ({sum(len(h) for _, h in pages) // len(pages) // 1024} KB avg)")
+    print(f"before (legacy_parse):  {before:8.1f} pages/sec")
+    print(f"after  (parse_product): {after:8.1f} pages/sec")
+    print(f"speedup: x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
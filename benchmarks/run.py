@@ -0,0 +1,252 @@
+"""
+Нагрузочный прогон API в процессе (httpx + ASGITransport, без сети и uvicorn):
+фиксированное число одновременных клиентов гоняет смесь запросов ко всем
+эндпоинтам /engines, /filters и /stats в течение --duration секунд.
+Отчет — p50/p95/p99 и rps по каждому сценарию, в JSON для benchmarks.compare.
+
+    python -m benchmarks.generate --size 100k --db
+    python -m benchmarks.run --concurrency 16 --duration 30 --out before.json
+    ... правки ...
+    python -m benchmarks.run --concurrency 16 --duration 30 --out after.json
+    python -m benchmarks.compare before.json after.json
+
+БД — текущий DATABASE_URL (SQLite или локальный Postgres).
+--no-cache выключает read-through кэш списков, чтобы мерить именно запросы в БД.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # nearest-rank по уже отсортированному списку
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 1) if seconds else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+class Sample:
+    # значения для параметров запросов, взятые из самой БД (с тем же перекосом, что в данных)
+    def __init__(self):
+        self.facets: List[Tuple[str, str, str]] = []
+        self.makes: List[str] = []
+        self.product_ids: List[int] = []
+        self.codes: List[str] = []
+        # для lookup — только OEM: код двигателя совпадает с тысячами товаров
+        self.oems: List[str] = []
+        self.cursors: List[Tuple[str, str]] = []
+
+    async def load(self, client: httpx.AsyncClient, session_factory):
+        from sqlalchemy import func, select
+
+        from db.models import Engine
+
+        async with session_factory() as session:
+            rows = await session.execute(select(Engine.make, Engine.model, Engine.year).limit(5000))
+            self.facets = [tuple(r) for r in rows if r[0] and r[1]]
+            self.makes = [f[0] for f in self.facets]
+            ids = await session.execute(select(Engine.product_id).order_by(func.random()).limit(2000))
+            self.product_ids = [r[0] for r in ids]
+            codes = await session.execute(
+                select(Engine.engine_code, Engine.oem).where(Engine.oem.isnot(None)).limit(2000)
+            )
+            for code, oem in codes:
+                first_oem = oem.split(",")[0].strip()
+                self.codes.extend(c for c in (code, first_oem) if c)
+                if first_oem:
+                    self.oems.append(first_oem)
+        if not self.facets or not self.product_ids:
+            raise SystemExit("empty catalog: run python -m benchmarks.generate first")
+
+        # курсоры вторых страниц для сценария list_next_page
+        for sort in ("product_id", "price_asc", "make_model"):
+            for make in list(dict.fromkeys(self.makes))[:5]:
+                r = await client.get("/engines/", params={"make": make, "sort": sort})
+                if r.headers.get("x-next-cursor"):
+                    self.cursors.append((sort, r.headers["x-next-cursor"]))
+
+
+Scenario = Callable[[httpx.AsyncClient, random.Random, Sample], Awaitable[httpx.Response]]
+
+
+def scenarios() -> Dict[str, Tuple[int, Scenario]]:
+    # имя -> (вес в смеси, запрос). Веса — примерная доля реального трафика.
+    def make_model_year(rnd, s):
+        make, model, _ = rnd.choice(s.facets)
+        year_min = rnd.randint(1995, 2015)
+        return {"make": make, "model": model, "year_min": year_min, "year_max": year_min + 5}
+
+    return {
+        "list_first_page": (15, lambda c, rnd, s: c.get("/engines/")),
+        "list_by_make": (15, lambda c, rnd, s: c.get("/engines/", params={"make": rnd.choice(s.makes)})),
+        "list_make_model_years": (10, lambda c, rnd, s: c.get("/engines/", params=make_model_year(rnd, s))),
+        "list_price_sorted": (8, lambda c, rnd, s: c.get("/engines/", params={
+            "sort": rnd.choice(["price_asc", "price_desc"]),
+            "price_min": rnd.choice([0, 20000, 50000]),
+            "price_max": rnd.choice([100000, 200000, 500000]),
+        })),
+        "list_next_page": (6, lambda c, rnd, s: c.get("/engines/", params=dict(zip(("sort", "cursor"), rnd.choice(s.cursors))))
+                           if s.cursors else c.get("/engines/", params={"offset": 20})),
+        "list_cards": (6, lambda c, rnd, s: c.get("/engines/", params={"make": rnd.choice(s.makes), "fields": "card"})),
+        "list_thumbnails_200": (3, lambda c, rnd, s: c.get("/engines/", params={"limit": 200, "images_limit": 1})),
+        "search": (8, lambda c, rnd, s: c.get("/engines/search", params={"q": rnd.choice(s.codes + s.makes)})),
+        "get_engine": (12, lambda c, rnd, s: c.get(f"/engines/{rnd.choice(s.product_ids)}")),
+        "batch_50": (4, lambda c, rnd, s: c.get("/engines/batch", params={
+            "ids": ",".join(map(str, rnd.sample(s.product_ids, min(50, len(s.product_ids)))))
+        })),
+        "lookup_100": (3, lambda c, rnd, s: c.post("/engines/lookup", json={
+            "codes": rnd.sample(s.oems or s.codes, min(100, len(s.oems or s.codes)))
+        })),
+        "filters_makes": (6, lambda c, rnd, s: c.get("/filters/makes")),
+        "filters_models": (5, lambda c, rnd, s: c.get("/filters/models", params={"make": rnd.choice(s.makes)})),
+        "filters_facets": (6, lambda c, rnd, s: c.get("/filters/facets", params=make_model_year(rnd, s))),
+        "stats_prices": (3, lambda c, rnd, s: c.get("/stats/prices", params=dict(zip(("make", "model"), rnd.choice(s.facets))))),
+        "stats_breakdown": (2, lambda c, rnd, s: c.get("/stats/prices/breakdown", params={"by": "year", "make": rnd.choice(s.makes)})),
+        "filters_years": (5, lambda c, rnd, s: c.get("/filters/years", params=dict(zip(("make", "model"), rnd.choice(s.facets))))),
+    }
+
+
+async def run(concurrency: int, duration: float, warmup: float, seed: int, only: List[str]) -> dict:
+    from sqlalchemy import func, select
+
+    from db.database import async_session, engine
+    from db.models import Engine
+    from main import app, startup
+    from services.warmup_service import warmup_service
+
+    table = scenarios()
+    if only:
+        table = {k: v for k, v in table.items() if k in only}
+    names = list(table)
+    weights = [table[n][0] for n in names]
+
+    await startup()
+    await warmup_service.wait()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        sample = Sample()
+        await sample.load(client, async_session)
+
+        results: Dict[str, List[float]] = {n: [] for n in names}
+        errors: Dict[str, int] = {n: 0 for n in names}
+        measuring = [False]
+
+        async def worker(i: int, deadline: float):
+            rnd = random.Random(seed * 1000 + i)
+            while time.perf_counter() < deadline:
+                name = rnd.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    r = await table[name][1](client, rnd, sample)
+                    failed = r.status_code >= 400
+                except Exception:
+                    failed = True
+                if measuring[0]:
+                    results[name].append(time.perf_counter() - started)
+                    errors[name] += failed
+
+        # прогрев: те же запросы, в отчет не попадают
+        if warmup > 0:
+            await asyncio.gather(*[worker(i, time.perf_counter() + warmup) for i in range(concurrency)])
+        measuring[0] = True
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i, started + duration) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    async with async_session() as session:
+        rows = (await session.execute(select(func.count()).select_from(Engine))).scalar()
+    dialect = engine.dialect.name
+    await engine.dispose()
+
+    all_latencies = [v for vs in results.values() for v in vs]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "dialect": dialect,
+            "engines_rows": rows,
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 2),
+            "warmup_s": warmup,
+            "seed": seed,
+            "cache_backend": os.environ.get("CACHE_BACKEND", "memory"),
+        },
+        "total": summarize(all_latencies, sum(errors.values()), elapsed),
+        "endpoints": {n: summarize(results[n], errors[n], elapsed) for n in names},
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return ""
+
+
+def print_report(report: dict):
+    meta = report["meta"]
+    print(f"{meta['dialect']}, {meta['engines_rows']} engines, concurrency {meta['concurrency']}, "
+          f"{meta['duration_s']}s, cache {meta['cache_backend']}")
+    print(f"{'scenario':24} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        print(f"{name:24} {s['count']:7d} {s['errors']:5d} {s['rps']:8.1f} "
+              f"{s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    ap.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before the run")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--only", nargs="*", default=[], help="run only these scenarios")
+    ap.add_argument("--no-cache", action="store_true", help="disable the listing cache (CACHE_BACKEND=off)")
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args()
+
+    # настройки читаются при импорте приложения, поэтому до него
+    if args.no_cache:
+        os.environ["CACHE_BACKEND"] = "off"
+    if args.only:
+        unknown = set(args.only) - set(scenarios())
+        if unknown:
+            raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args.concurrency, args.duration, args.warmup, args.seed, args.only))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Saved: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
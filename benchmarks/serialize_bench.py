@@ -0,0 +1,141 @@
+"""
+Микро-бенчмарк сериализации страницы /engines/: CPU на один ответ.
+before — как было: EngineOut(...) с валидацией на каждую строку, затем FastAPI
+повторно валидирует список по response_model и кодирует через json.dumps.
+after — строки из EngineDAO (картинки уже списком url) -> EngineOut.model_construct
++ ENGINE_LIST_JSON.dump_json (routes/engines.py).
+
+    python -m benchmarks.serialize_bench [--limit 200] [--images 5] [--seconds 3]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+
+from dao.engines_dao import ENGINE_COLUMNS
+from db.models import Engine, EngineImage
+from schemas.engine import EngineOut, ENGINE_LIST_JSON
+from services.engines_service import engines_service
+
+
+def make_engines(n: int, images: int, seed: int = 1) -> list:
+    # объекты ORM без БД: сервису все равно, откуда они
+    rnd = random.Random(seed)
+    engines = []
+    for i in range(1, n + 1):
+        e = Engine(
+            product_id=100000 + i,
+            title=f"Двигатель Toyota 1JZ-GTE #{i}",
+            make=rnd.choice(["Toyota", "Nissan", "Honda", None]),
+            model=rnd.choice(["Mark II", "Skyline", "Civic"]),
+            year=rnd.choice(["03.2001", "1998", None]),
+            engine_code="1JZ-GTE",
+            engine_type="ДВС",
+            price=rnd.choice([None, rnd.randint(10000, 250000)]),
+            currency="RUB",
+            stock_text="В наличии",
+            oem="19000-46150, 19000-46151",
+            description="Контрактный двигатель без пробега по РФ. " * 8,
+        )
+        e.images = [EngineImage(image_url=f"https://example.com/img/{i}/{j}.jpg", sort_order=images - j)
+                    for j in range(images)]
+        engines.append(e)
+    return engines
+
+
+# такие же строки Row, как возвращает EngineDAO: колонки Engine + images
+ROW_KEYS = [c.key for c in ENGINE_COLUMNS] + ["images"]
+
+
+def as_rows(engines) -> list:
+    values = [tuple(getattr(e, c.key) for c in ENGINE_COLUMNS) + (legacy_images_to_urls(e),) for e in engines]
+    return IteratorResult(SimpleResultMetaData(ROW_KEYS), iter(values)).all()
+
+
+def legacy_images_to_urls(engine) -> list:
+    # EnginesService._images_to_urls: сортировка ORM-объектов EngineImage в python
+    if not getattr(engine, "images", None):
+        return []
+    return [img.image_url for img in sorted(engine.images, key=lambda img: img.sort_order)]
+
+
+def legacy_to_out(e) -> EngineOut:
+    # EnginesService._to_out до fast path: конструктор с валидацией
+    return EngineOut(
+        product_id=e.product_id,
+        title=e.title,
+        make=e.make,
+        model=e.model,
+        year=e.year,
+        engine_code=e.engine_code,
+        engine_type=e.engine_type,
+        price=e.price,
+        currency=e.currency,
+        stock_text=e.stock_text,
+        oem=e.oem,
+        description=e.description,
+        images=legacy_images_to_urls(e),
+    )
+
+
+def response_field():
+    # тот же ModelField, которым FastAPI валидирует ответ GET /engines/
+    from main import app
+    return next(r for r in app.routes if getattr(r, "path", None) == "/engines/").response_field
+
+
+def before(engines, rows, field, loop) -> bytes:
+    items = [legacy_to_out(e) for e in engines]
+    content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def after(engines, rows, field, loop) -> bytes:
+    return ENGINE_LIST_JSON.dump_json([engines_service._to_out(r) for r in rows])
+
+
+def us_per_call(fn, args, seconds: float) -> float:
+    done, started = 0, time.perf_counter()
+    while True:
+        fn(*args)
+        done += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return elapsed / done * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--limit", type=int, default=200, help="engines per page")
+    ap.add_argument("--images", type=int, default=5, help="images per engine")
+    ap.add_argument("--seconds", type=float, default=3.0, help="time budget per variant")
+    args = ap.parse_args()
+
+    engines = make_engines(args.limit, args.images)
+    rows = as_rows(engines)
+    field = response_field()
+    loop = asyncio.new_event_loop()
+    try:
+        # сначала убеждаемся, что ответ тот же
+        old, new = before(engines, rows, field, loop), after(engines, rows, field, loop)
+        if json.loads(old) != json.loads(new):
+            raise SystemExit("responses differ")
+
+        t_before = us_per_call(before, (engines, rows, field, loop), args.seconds)
+        t_after = us_per_call(after, (engines, rows, field, loop), args.seconds)
+    finally:
+        loop.close()
+
+    print(f"page: {args.limit} engines x {args.images} images, {len(new) // 1024} KB json")
+    print(f"before (validate + json.dumps): {t_before:10.0f} us/request")
+    print(f"after  (rows + dump_json):      {t_after:10.0f} us/request")
+    print(f"saved: {t_before - t_after:.0f} us/request (x{t_before / t_after:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Бенчмарк старта воркера: время до готовности (GET /health/ready = 200)
+и время первых запросов сразу после нее — с прогревом и без.
+
+    python -m benchmarks.startup_bench [--runs 3] [--port 8765]
+
+Нужен DATABASE_URL с уже созданной схемой и данными (python -m db.schema + load_csv.py).
+Варианты:
+  legacy — как было: create_all на старте, без прогрева;
+  warm   — без DDL, соединения пула и популярные списки прогреты до готовности.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+VARIANTS = {
+    "legacy": {"CREATE_SCHEMA_ON_STARTUP": "1", "WARMUP_CONNECTIONS": "0", "WARMUP_LISTINGS": "0"},
+    "warm": {"CREATE_SCHEMA_ON_STARTUP": "0"},
+}
+
+# то, что открывает пользователь первым делом
+FIRST_REQUESTS = ["/engines/", "/engines/?sort=price_asc", "/filters/makes"]
+
+
+def run_once(env_overrides: dict, port: int, timeout: float = 60.0) -> dict:
+    env = dict(os.environ, **env_overrides)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        with httpx.Client(base_url=base, timeout=10) as client:
+            while True:
+                if proc.poll() is not None:
+                    raise SystemExit(f"uvicorn exited with code {proc.returncode}")
+                if time.perf_counter() - started > timeout:
+                    raise SystemExit("server did not become ready in time")
+                try:
+                    if client.get("/health/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            ready = time.perf_counter() - started
+
+            first = []
+            for path in FIRST_REQUESTS:
+                t = time.perf_counter()
+                client.get(path).raise_for_status()
+                first.append(time.perf_counter() - t)
+        return {"ready": ready, "first": sum(first), "to_first_response": ready + first[0]}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    print(f"{'variant':8} {'ready, s':>10} {'first reqs, ms':>15} {'to 1st response, s':>20}")
+    for name, env in VARIANTS.items():
+        runs = [run_once(env, args.port) for _ in range(args.runs)]
+        ready = statistics.median(r["ready"] for r in runs)
+        first = statistics.median(r["first"] for r in runs) * 1000
+        ttfr = statistics.median(r["to_first_response"] for r in runs)
+        print(f"{name:8} {ready:10.3f} {first:15.1f} {ttfr:20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import CACHE_BACKEND, CACHE_URL, CACHE_TTL, CACHE_MAX_ENTRIES
+
+
+class CacheBackend:
+    """
+    Хранилище кэша. shared=True — общее для нескольких процессов (значения лежат байтами),
+    иначе это память процесса и значения хранятся как есть, без сериализации.
+    """
+    shared = False
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    # LRU на OrderedDict: при чтении ключ уходит в конец, вытесняем с начала
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def clear(self):
+        self._data.clear()
+
+
+class LocalSharedCache(MemoryCache):
+    """
+    Локальная замена общего хранилища (для разработки и тестов без Redis):
+    те же байты и TTL, что и в RedisCache, но в памяти процесса.
+    """
+    shared = True
+
+
+class RedisCache(CacheBackend):
+    # общий кэш для всех воркеров; пакет redis нужен только с этим бэкендом
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "engines-api:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=shared with CACHE_URL requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        # вытеснение по памяти — политикой самого Redis (maxmemory-policy allkeys-lru)
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def clear(self):
+        # ключи старых поколений каталога доживают свой TTL сами
+        pass
+
+
+def make_backend(name: str = CACHE_BACKEND, url: Optional[str] = CACHE_URL) -> Optional[CacheBackend]:
+    if name == "off":
+        return None
+    if name == "memory":
+        return MemoryCache()
+    if name == "shared":
+        return RedisCache(url) if url else LocalSharedCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+
+
+class ReadThroughCache:
+    """
+    get_or_load(key, load): значение из кэша, а при промахе — из load().
+    Одновременные промахи по одному ключу ждут один и тот же load() (coalescing),
+    поэтому сотня одинаковых запросов после импорта дает один запрос в БД.
+    dumps/loads (в строку/байты и обратно) нужны только общему хранилищу.
+    """
+    def __init__(self,
+                 backend: Optional[CacheBackend],
+                 ttl: float = CACHE_TTL,
+                 dumps: Callable[[Any], Any] = None,
+                 loads: Callable[[Any], Any] = None,
+                 ):
+        self.backend = backend
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        if self.backend is None:
+            return await load()
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return self.loads(cached) if self.backend.shared else cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                value = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # отменили сам этот запрос — пробрасываем; отменили ведущий — грузим сами
+                if not pending.cancelled():
+                    raise
+            else:
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await load()
+        except Exception as e:
+            future.set_exception(e)
+            # исключение уже отдали ждущим; если их нет — не шумим "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            await self.backend.set(key, self.dumps(value) if self.backend.shared else value, self.ttl)
+            return value
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def clear(self):
+        if self.backend is not None:
+            await self.backend.clear()
@@ -4,5 +4,34 @@ from dotenv import load_dotenv   #Импорт функции чтобы про
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
+# Read-only снимок каталога (python -m db.snapshot): если задан, API читает только его, без Postgres
+CATALOG_SNAPSHOT = os.getenv('CATALOG_SNAPSHOT')
+if not DATABASE_URL and not CATALOG_SNAPSHOT:
     raise Exception('Database url does not exist')
+
+# Лог всех SQL-запросов (echo sqlalchemy) — только для отладки, в проде смотрим /metrics
+SQL_ECHO = os.getenv('SQL_ECHO', '').lower() in ('1', 'true', 'yes')
+# Запросы дольше этого (мс) пишутся в лог sql.slow
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+
+# Выше этой оценки планировщика точный count(*) over () не считаем, отдаем оценку
+EXACT_COUNT_THRESHOLD = int(os.getenv('EXACT_COUNT_THRESHOLD', '10000'))
+# Сколько секунд держим оценку количества строк для одного набора фильтров
+COUNT_ESTIMATE_TTL = int(os.getenv('COUNT_ESTIMATE_TTL', '300'))
+# Как часто (сек) процесс перепроверяет поколение каталога в БД
+CATALOG_CHECK_SECONDS = float(os.getenv('CATALOG_CHECK_SECONDS', '30'))
+
+# Кэш GET /engines: memory (в процессе), shared (Redis по CACHE_URL, без него — локальная замена), off
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_URL = os.getenv('CACHE_URL')
+# Сколько секунд живет закэшированная страница и сколько страниц держим в памяти процесса
+CACHE_TTL = float(os.getenv('CACHE_TTL', '30'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+
+# create_all на старте приложения (для локальной разработки); в проде схема — `python -m db.schema`
+CREATE_SCHEMA_ON_STARTUP = os.getenv('CREATE_SCHEMA_ON_STARTUP', '').lower() in ('1', 'true', 'yes')
+# Прогрев на старте: сколько соединений пула открыть заранее (не больше pool_size)
+# и по скольким самым частым маркам положить в кэш первую страницу списка (0 — не прогревать списки;
+# такие страницы живут CACHE_TTL, как любые другие)
+WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', '5'))
+WARMUP_LISTINGS = int(os.getenv('WARMUP_LISTINGS', '10'))
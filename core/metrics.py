@@ -0,0 +1,152 @@
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Метрики процесса в текстовом формате Prometheus (GET /metrics).
+# Свой минимальный реестр вместо prometheus_client: нужны только counter/gauge/histogram.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+ROWS_BUCKETS = (0, 1, 10, 50, 100, 200, 500, 1000, 10000, 100000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    # значение снимается в момент опроса /metrics: fn() -> {значения меток: число}
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in sorted(self.fn().items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счетчики по корзинам..., сумма, количество]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            # в формате Prometheus корзины кумулятивные
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    labels=("method", "route", "status"),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время ответа по шаблону маршрута ("/engines/{product_id}"),
+    а не по фактическому пути — иначе у гистограммы будет по серии на каждый id.
+    Время считается до конца отправки тела, включая стриминговые ответы.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status[0],
+            )
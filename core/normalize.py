@@ -0,0 +1,67 @@
+import re
+from typing import List, Optional, Tuple
+
+# все, что не буква и не цифра: дефисы, пробелы, точки, слэши...
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+# разделители нескольких OEM в одной строке. Пробел не разделитель: "19000 46150" — один номер
+_OEM_SPLIT_RE = re.compile(r"[,;/|\n]+")
+
+# год выпуска в тексте: "03.2011", "2011-03", "2005", "2005 г."
+_YEAR = r"(19\d{2}|20\d{2})"
+_MONTH_YEAR_RE = re.compile(r"(?<!\d)(\d{1,2})[./-]" + _YEAR + r"(?!\d)")
+_YEAR_MONTH_RE = re.compile(r"(?<!\d)" + _YEAR + r"[./-](\d{1,2})(?!\d)")
+_YEAR_RE = re.compile(r"(?<!\d)" + _YEAR + r"(?!\d)")
+
+# колонки engines, которые не приходят из источника, а вычисляются при загрузке
+DERIVED_FIELDS = ["engine_code_norm", "year_num", "year_month"]
+
+
+def normalize_code(value: Optional[str]) -> Optional[str]:
+    """'19000-46150', '1900046150', '19000 46150' -> '1900046150'; '1jz-gte' -> '1JZGTE'."""
+    if not value:
+        return None
+    key = _NON_ALNUM_RE.sub("", str(value)).upper()
+    return key or None
+
+
+def split_oem(value: Optional[str]) -> List[str]:
+    # "19000-46150, 19000-46151" -> ['1900046150', '1900046151'], без повторов
+    if not value:
+        return []
+    keys = (normalize_code(part) for part in _OEM_SPLIT_RE.split(str(value)))
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+def parse_year(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """'03.2011' -> (2011, 3); '2011-03' -> (2011, 3); '2005' -> (2005, None); мусор -> (None, None)."""
+    if not value:
+        return None, None
+    value = str(value)
+    m = _MONTH_YEAR_RE.search(value)
+    if m:
+        month, year = int(m.group(1)), int(m.group(2))
+        return year, (month if 1 <= month <= 12 else None)
+    m = _YEAR_MONTH_RE.search(value)
+    if m:
+        year, month = int(m.group(1)), int(m.group(2))
+        return year, (month if 1 <= month <= 12 else None)
+    m = _YEAR_RE.search(value)
+    if m:
+        return int(m.group(1)), None
+    return None, None
+
+
+def year_sort_key(value: Optional[str]) -> tuple:
+    # хронологический порядок строковых годов; нераспознанные — в конце, по алфавиту
+    year, month = parse_year(value)
+    return (year is None, year or 0, month or 0, value or "")
+
+
+def derived_fields(row: dict) -> dict:
+    # значения DERIVED_FIELDS для строки engines (dict с полями json_to_csv.ENGINE_FIELDS)
+    year_num, year_month = parse_year(row.get("year"))
+    return {
+        "engine_code_norm": normalize_code(row.get("engine_code")),
+        "year_num": year_num,
+        "year_month": year_month,
+    }
@@ -0,0 +1,36 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import CatalogMeta
+
+CATALOG_META_ID = 1
+
+class CatalogDAO:
+    async def get_generation(self,
+                             session: AsyncSession,
+                             ) -> int:
+        result = await session.execute(select(CatalogMeta.generation).where(CatalogMeta.id == CATALOG_META_ID))
+        return result.scalar() or 0
+
+    async def bump_generation(self,
+                              session: AsyncSession,
+                              ) -> int:
+        """
+        Увеличивает поколение каталога. Коммит — на вызывающем,
+        чтобы bump попал в ту же транзакцию, что и сам импорт.
+        """
+        result = await session.execute(
+            update(CatalogMeta)
+            .where(CatalogMeta.id == CATALOG_META_ID)
+            .values(generation=CatalogMeta.generation + 1)
+            .returning(CatalogMeta.generation)
+        )
+        generation = result.scalar()
+        if generation is None:
+            session.add(CatalogMeta(id=CATALOG_META_ID, generation=1))
+            await session.flush()
+            generation = 1
+        return generation
+
+
+catalog_dao = CatalogDAO()
@@ -1,9 +1,142 @@
-from typing import List, Optional
-from sqlalchemy import select
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, tuple_, func, text, literal_column, case, or_, and_, union, type_coerce, JSON, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from db.models import Engine
+from core.config import COUNT_ESTIMATE_TTL
+from db.models import Engine, EngineImage, EngineOem, PRICE_MAX, price_asc_key, price_desc_key, make_key, model_key
+
+# колонки engines, которые отдает API (служебные вроде engine_code_norm не читаем)
+ENGINE_COLUMNS = (
+    Engine.product_id,
+    Engine.title,
+    Engine.make,
+    Engine.model,
+    Engine.year,
+    Engine.engine_code,
+    Engine.engine_type,
+    Engine.price,
+    Engine.currency,
+    Engine.stock_text,
+    Engine.oem,
+    Engine.description,
+)
+
+# sort -> (выражения ORDER BY, по убыванию?, как посчитать тот же ключ у строки в python)
+SORTS = {
+    "product_id": (
+        (Engine.product_id,),
+        False,
+        lambda e: [e.product_id],
+    ),
+    "price_asc": (
+        (price_asc_key, Engine.product_id),
+        False,
+        lambda e: [e.price if e.price is not None else PRICE_MAX, e.product_id],
+    ),
+    "price_desc": (
+        (price_desc_key, Engine.product_id),
+        True,
+        lambda e: [e.price if e.price is not None else -1, e.product_id],
+    ),
+    "make_model": (
+        (make_key, model_key, Engine.product_id),
+        False,
+        lambda e: [e.make or "", e.model or "", e.product_id],
+    ),
+}
+
+# колонки, без которых не посчитать ключ сортировки (и курсор) — читаются при любом fields
+SORT_FIELDS = {
+    "product_id": ("product_id",),
+    "price_asc": ("product_id", "price"),
+    "price_desc": ("product_id", "price"),
+    "make_model": ("product_id", "make", "model"),
+}
+
+# типы элементов ключа сортировки (для проверки курсора от клиента): str или диапазон целого по колонке
+_INT32 = (-2 ** 31, 2 ** 31 - 1)
+_INT64 = (-2 ** 63, 2 ** 63 - 1)
+SORT_KEY_TYPES = {
+    "product_id": (_INT32,),
+    "price_asc": (_INT64, _INT32),
+    "price_desc": (_INT64, _INT32),
+    "make_model": (str, str, _INT32),
+}
+
+# кэш оценок планировщика: ключ фильтров -> (когда протухает, оценка)
+_ESTIMATES: Dict[tuple, Tuple[float, int]] = {}
+_ESTIMATES_MAX = 1024
+
+
+def filter_conditions(make: Optional[str] = None,
+                      model: Optional[str] = None,
+                      year: Optional[str] = None,
+                      price_min: Optional[int] = None,
+                      price_max: Optional[int] = None,
+                      year_min: Optional[int] = None,
+                      year_max: Optional[int] = None,
+                      ) -> list:
+    # условия WHERE фильтров списка; отдельно от запроса — их же берут счетчики фасетов
+    conditions = []
+    if make:
+        conditions.append(Engine.make == make)
+    if model:
+        conditions.append(Engine.model == model)
+    if year:
+        conditions.append(Engine.year == year)
+    # диапазон по году выпуска (year_num); строки с нераспознанным годом в него не попадают
+    if year_min is not None:
+        conditions.append(Engine.year_num >= year_min)
+    if year_max is not None:
+        conditions.append(Engine.year_num <= year_max)
+
+    if price_min is not None:
+        conditions.append(Engine.price >= price_min)
+    if price_max is not None:
+        conditions.append(Engine.price <= price_max)
+    return conditions
+
+
+def _apply_filters(query, *args, **kwargs):
+    conditions = filter_conditions(*args, **kwargs)
+    return query.where(*conditions) if conditions else query
+
+
+def _images_column(session: AsyncSession, images_limit: Optional[int] = None):
+    """
+    URL картинок строки engines, уже упорядоченные по sort_order, одним значением (списком):
+    без второго запроса selectinload и без ORM-объекта на каждую картинку.
+    Коррелированный подзапрос по индексу (product_id, sort_order, image_url) —
+    на каждый товар читается только его начало, images_limit обрезает прямо в БД.
+    Postgres: ARRAY(SELECT ...); SQLite: json_group_array, драйвер вернет json-строку,
+    ее разбирает тип JSON.
+    """
+    urls = (
+        select(EngineImage.image_url)
+        .where(EngineImage.product_id == Engine.product_id)
+        .order_by(EngineImage.sort_order, EngineImage.image_url)
+        .limit(images_limit)
+        .correlate(Engine)
+    )
+    if session.bind.dialect.name == "postgresql":
+        return type_coerce(func.array(urls.scalar_subquery()), ARRAY(Text)).label("images")
+    ordered = urls.subquery()
+    return type_coerce(select(func.json_group_array(ordered.c.image_url)).scalar_subquery(), JSON).label("images")
+
+
+def _engine_rows(session: AsyncSession, images_limit: Optional[int] = None, *extra,
+                 fields: Optional[Sequence[str]] = None):
+    # строки (колонки ENGINE_COLUMNS..., images) — с ними работают _to_out и sort_key как с Engine.
+    # fields — читать только эти колонки: без description и картинок запрос и ответ в разы легче
+    columns = [c for c in ENGINE_COLUMNS if fields is None or c.key in fields]
+    if fields is None or "images" in fields:
+        columns.append(_images_column(session, images_limit))
+    return select(*columns, *extra)
+
 
 class EngineDAO:
     async def list_engines(self,
@@ -13,37 +146,228 @@ class EngineDAO:
                            year: Optional[str] = None,
                            price_min: Optional[int] = None,
                            price_max: Optional[int] = None,
+                           year_min: Optional[int] = None,
+                           year_max: Optional[int] = None,
                            limit: int = 20,
                            offset: int = 0,
-                           ) -> List[Engine]:
+                           sort: str = "product_id",
+                           after: Optional[Sequence] = None,
+                           with_total: bool = True,
+                           images_limit: Optional[int] = None,
+                           fields: Optional[Sequence[str]] = None,
+                           ) -> Tuple[Optional[int], List[Row]]:
+        """
+        after — ключ сортировки последней строки предыдущей страницы (keyset).
+        С ним страница ищется по индексу, а не через пропуск offset строк.
+
+        with_total — посчитать общее число строк под фильтр тем же запросом
+        (count(*) over (), на SQLite — отдельным count(*)). Окно считается до limit/offset, но после where,
+        поэтому вместе с after это число оставшихся строк, а не всех.
+        Если total не считали (или страница пустая из-за offset) — вернется None.
+
+        Возвращает строки с колонками Engine и images (список url, не больше images_limit);
+        с fields — только эти колонки плюс нужные для ключа сортировки.
+        """
+        columns, descending, _ = SORTS[sort]
+        if fields is not None:
+            fields = list(dict.fromkeys([*SORT_FIELDS[sort], *fields]))
+        if after is not None and len(after) != len(columns):
+            raise ValueError("Invalid cursor")
+
+        def where(query):
+            query = _apply_filters(query, make, model, year, price_min, price_max, year_min, year_max)
+            if after is not None:
+                key = tuple_(*columns)
+                query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+            return query
 
-        result = select(Engine).options(selectinload(Engine.images))
+        # Postgres считает окно по индексу вместе со страницей. SQLite для count(*) over ()
+        # сортирует все строки под фильтр со всеми колонками (сотни мс на 100k строк),
+        # а отдельный count(*) отвечает по индексу за доли миллисекунды
+        window_total = with_total and session.bind.dialect.name == "postgresql"
 
-        if make:
-            result = result.where(Engine.make == make)
-        if model:
-            result = result.where(Engine.model == model)
-        if year:
-            result = result.where(Engine.year == year)
+        result = _engine_rows(session, images_limit, fields=fields)
+        if window_total:
+            result = _engine_rows(session, images_limit, func.count().over().label("total"), fields=fields)
+        result = where(result)
 
-        if price_min is not None:
-            result = result.where(Engine.price >= price_min)
-        if price_max is not None:
-            result = result.where(Engine.price <= price_max)
+        if descending:
+            result = result.order_by(*[c.desc() for c in columns])
+        else:
+            result = result.order_by(*columns)
 
         #пагинация
         result = result.limit(limit).offset(offset)
 
-        engines = await session.execute(result)
-        return engines.scalars().all()
+        rows = (await session.execute(result)).all()
+        if not with_total:
+            return None, rows
+
+        if not window_total:
+            if not rows and offset:
+                return None, []
+            total = (await session.execute(where(select(func.count()).select_from(Engine)))).scalar()
+            return total, rows
+
+        if not rows:
+            return (0 if not offset else None), []
+        return rows[0].total, rows
+
+    async def estimate_count(self,
+                             session: AsyncSession,
+                             make: Optional[str] = None,
+                             model: Optional[str] = None,
+                             year: Optional[str] = None,
+                             price_min: Optional[int] = None,
+                             price_max: Optional[int] = None,
+                             year_min: Optional[int] = None,
+                             year_max: Optional[int] = None,
+                             ) -> Optional[int]:
+        """
+        Оценка числа строк под фильтр из планировщика Postgres (EXPLAIN, без выполнения).
+        Кэшируется на COUNT_ESTIMATE_TTL секунд. Для других БД — None.
+        """
+        if session.bind.dialect.name != "postgresql":
+            return None
+
+        key = (make, model, year, price_min, price_max, year_min, year_max)
+        now = time.monotonic()
+        cached = _ESTIMATES.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        query = _apply_filters(select(Engine.product_id), make, model, year, price_min, price_max, year_min, year_max)
+        compiled = query.compile()
+        explain = text("EXPLAIN (FORMAT JSON) " + str(compiled)).bindparams(**compiled.params)
+        plan = (await session.execute(explain)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+
+        if len(_ESTIMATES) >= _ESTIMATES_MAX:
+            _ESTIMATES.clear()
+        _ESTIMATES[key] = (now + COUNT_ESTIMATE_TTL, estimate)
+        return estimate
+
+    async def search_engines(self,
+                             session: AsyncSession,
+                             q: str,
+                             make: Optional[str] = None,
+                             model: Optional[str] = None,
+                             year: Optional[str] = None,
+                             price_min: Optional[int] = None,
+                             price_max: Optional[int] = None,
+                             year_min: Optional[int] = None,
+                             year_max: Optional[int] = None,
+                             limit: int = 20,
+                             offset: int = 0,
+                             images_limit: Optional[int] = None,
+                             ) -> Tuple[Optional[int], List[Row]]:
+        """
+        Поиск по title/description/OEM/коду двигателя, по убыванию релевантности.
+        Postgres: search_tsv @@ запрос (GIN) или подстрока в коде/OEM (триграммный GIN).
+        Другие БД (SQLite в локальных тестах): каждое слово запроса должно встретиться
+        хотя бы в одном поле, вес — по тому, в каком поле нашлось.
+        """
+        code_hit = Engine.engine_code.icontains(q, autoescape=True)
+        oem_hit = Engine.oem.icontains(q, autoescape=True)
+
+        if session.bind.dialect.name == "postgresql":
+            tsv = literal_column("engines.search_tsv")
+            tsq = func.websearch_to_tsquery(literal_column("'russian'"), q).op("||")(
+                func.websearch_to_tsquery(literal_column("'simple'"), q)
+            )
+            match = or_(tsv.op("@@")(tsq), code_hit, oem_hit)
+            rank = (
+                func.ts_rank_cd(tsv, tsq)
+                + case((code_hit, 1.0), else_=0.0)
+                + case((oem_hit, 0.5), else_=0.0)
+            )
+        else:
+            words = q.split() or [q]
+            fields = ((Engine.engine_code, 3), (Engine.oem, 3), (Engine.title, 2), (Engine.description, 1))
+            match = and_(*[
+                or_(*[col.icontains(w, autoescape=True) for col, _ in fields])
+                for w in words
+            ])
+            rank = sum(
+                case((col.icontains(w, autoescape=True), weight), else_=0)
+                for w in words
+                for col, weight in fields
+            )
+
+        result = _engine_rows(session, images_limit, func.count().over().label("total")).where(match)
+        result = _apply_filters(result, make, model, year, price_min, price_max, year_min, year_max)
+        result = result.order_by(rank.desc(), Engine.product_id).limit(limit).offset(offset)
+
+        rows = (await session.execute(result)).all()
+        if not rows:
+            return (0 if not offset else None), []
+        return rows[0].total, rows
+
+    async def lookup_codes(self,
+                           session: AsyncSession,
+                           keys: Sequence[str],
+                           ) -> List[Tuple[str, Row]]:
+        """
+        Пары (нормализованный ключ, строка двигателя) для всех товаров, у которых ключ
+        совпал с OEM (engine_oems) или с кодом двигателя (engine_code_norm).
+        Один запрос по двум индексам, картинки собираются в нем же.
+        """
+        if not keys:
+            return []
+        matches = union(
+            select(EngineOem.oem_norm.label("code"), EngineOem.product_id).where(EngineOem.oem_norm.in_(keys)),
+            select(Engine.engine_code_norm.label("code"), Engine.product_id).where(Engine.engine_code_norm.in_(keys)),
+        ).subquery()
+
+        result = (
+            _engine_rows(session, None, matches.c.code)
+            .join(matches, matches.c.product_id == Engine.product_id)
+            .order_by(matches.c.code, Engine.product_id)
+        )
+        rows = (await session.execute(result)).all()
+        return [(row.code, row) for row in rows]
+
+    def sort_key(self, sort: str, engine: Row) -> list:
+        return SORTS[sort][2](engine)
 
     async def get_engine(self,
                          session: AsyncSession,
-                         product_id: int
-                         ) -> Engine:
-        result = await session.execute(select(Engine).where(Engine.product_id == product_id).options(selectinload(Engine.images)))
-        return result.scalars().one_or_none()
+                         product_id: int,
+                         fields: Optional[Sequence[str]] = None,
+                         ) -> Optional[Row]:
+        result = await session.execute(_engine_rows(session, fields=fields).where(Engine.product_id == product_id))
+        return result.one_or_none()
 
+    async def get_engines(self,
+                          session: AsyncSession,
+                          product_ids: Sequence[int],
+                          images_limit: Optional[int] = None,
+                          ) -> List[Row]:
+        # пачка товаров одним запросом (engines по IN, картинки в нем же), порядок не гарантирован
+        if not product_ids:
+            return []
+        result = await session.execute(
+            _engine_rows(session, images_limit).where(Engine.product_id.in_(product_ids))
+        )
+        return result.all()
 
-engine_dao = EngineDAO()
+    async def stream_engines(self,
+                             session: AsyncSession,
+                             batch_size: int = 1000,
+                             **filters,
+                             ) -> AsyncIterator[List[Row]]:
+        """
+        Все строки под фильтры по product_id пачками по batch_size через серверный курсор
+        (session.stream + yield_per): один последовательный проход, в памяти только текущая пачка.
+        """
+        query = _apply_filters(_engine_rows(session), **filters) \
+            .order_by(Engine.product_id) \
+            .execution_options(yield_per=batch_size)
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield rows
 
+
+engine_dao = EngineDAO()
@@ -1,8 +1,20 @@
-from typing import Optional, List
-from sqlalchemy import select, distinct
+from typing import Dict, Optional, List, Tuple
+from sqlalchemy import select, distinct, func, and_, or_, tuple_, text, literal, null, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
+from core.normalize import year_sort_key
+from dao.engines_dao import filter_conditions
 from db.models import Engine
 
+# фасет -> колонка и фильтры, которые он не учитывает: счетчики марок считаются
+# без фильтра по марке (видно, сколько даст другая марка), годов — без фильтров по году
+FACETS = {
+    "make": (Engine.make, ("make",)),
+    "model": (Engine.model, ("model",)),
+    "year": (Engine.year_num, ("year", "year_min", "year_max")),
+}
+# grouping(make, model, year_num) -> какой набор группировки дал строку (None — итог по всем фильтрам)
+_GROUPING_FACETS = {0b011: "make", 0b101: "model", 0b110: "year", 0b111: None}
+
 class FiltersDAO:
     async def get_makes(self,
                           session: AsyncSession,
@@ -46,9 +58,98 @@ class FiltersDAO:
         if model:
             result = result.where(Engine.model == model)
 
-        result = result.order_by(Engine.year)
+        final = await session.execute(result)
+        # по хронологии ("12.1999" < "2005" < "03.2011"), а не как строки
+        return sorted((i[0] for i in final.all() if i[0]), key=year_sort_key)
+
+    async def get_facet_rows(self,
+                             session: AsyncSession,
+                             ) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        # все уникальные тройки (make, model, year) — из них строится индекс фасетов
+        result = select(Engine.make, Engine.model, Engine.year).distinct()
 
         final = await session.execute(result)
-        return [i[0] for i in final.all() if i[0]]
+        return [tuple(i) for i in final.all()]
+
+    async def get_top_makes(self,
+                            session: AsyncSession,
+                            limit: int = 10,
+                            ) -> List[str]:
+        # марки с наибольшим числом товаров — их списки открывают чаще всего
+        result = (
+            select(Engine.make)
+            .where(Engine.make.isnot(None))
+            .group_by(Engine.make)
+            .order_by(func.count().desc(), Engine.make)
+            .limit(limit)
+        )
+
+        final = await session.execute(result)
+        return [i[0] for i in final.all()]
+
+    async def get_facet_counts(self,
+                               session: AsyncSession,
+                               **filters,
+                               ) -> Tuple[int, Dict[str, List[tuple]]]:
+        """
+        Счетчики фасетов под фильтры списка (те же, что у GET /engines) одним запросом:
+        (всего строк под все фильтры, {"make"|"model"|"year": [(значение, число), ...]}).
+        Значения без товаров и пустые (NULL) не возвращаются.
+        """
+        conditions = {
+            name: filter_conditions(**{k: v for k, v in filters.items() if k not in own})
+            for name, (_, own) in FACETS.items()
+        }
+        everything = filter_conditions(**filters)
+
+        counts: Dict[str, List[tuple]] = {name: [] for name in FACETS}
+        total = 0
+        for facet, value, count in await self._facet_rows(session, conditions, everything):
+            if facet is None:
+                total = count
+            elif value is not None and count:
+                counts[facet].append((value, count))
+        for items in counts.values():
+            items.sort(key=lambda item: item[0])
+        return total, counts
+
+    async def _facet_rows(self, session: AsyncSession, conditions: dict, everything: list) -> List[tuple]:
+        if session.bind.dialect.name == "postgresql":
+            # один проход по engines: GROUPING SETS по каждому фасету + итог,
+            # у каждого фасета свой count(*) FILTER без его собственных условий
+            columns = [column for column, _ in FACETS.values()]
+
+            def counted(conds):
+                return func.count().filter(and_(*conds)) if conds else func.count()
+
+            query = select(
+                func.grouping(*columns),
+                *columns,
+                *[counted(conditions[name]) for name in FACETS],
+                counted(everything),
+            ).group_by(func.grouping_sets(*[tuple_(c) for c in columns], text("()")))
+            if all(conditions.values()):
+                # строки, которые не попадут ни в один счетчик, не читаем
+                query = query.where(or_(*[and_(*c) for c in conditions.values()]))
+
+            names = list(FACETS)
+            rows = []
+            # строка: grouping, значения фасетов..., счетчики фасетов..., итог
+            for row in await session.execute(query):
+                facet = _GROUPING_FACETS[row[0]]
+                if facet is None:
+                    rows.append((None, None, row[-1]))
+                else:
+                    i = names.index(facet)
+                    rows.append((facet, row[1 + i], row[1 + len(names) + i]))
+            return rows
+
+        # SQLite: без GROUPING SETS — UNION ALL группировок, у каждой свой WHERE
+        parts = [
+            select(literal(name), column, func.count()).where(*conditions[name]).group_by(column)
+            for name, (column, _) in FACETS.items()
+        ]
+        parts.append(select(null(), null(), func.count()).select_from(Engine).where(*everything))
+        return [tuple(r) for r in await session.execute(union_all(*parts))]
 
 filters_dao = FiltersDAO()
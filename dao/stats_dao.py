@@ -0,0 +1,193 @@
+import json
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, delete, insert, text, bindparam, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Engine, PriceStat, make_key
+
+# "любое значение" в ключе price_stats
+ANY = "*"
+
+# границы корзин гистограммы: корзина i — [EDGES[i-1], EDGES[i]), первая от 0, последняя без верха.
+# Считается как width_bucket в Postgres и bisect_right в python — номера совпадают
+PRICE_BUCKET_EDGES = (10_000, 20_000, 30_000, 50_000, 75_000, 100_000, 150_000, 200_000, 300_000, 500_000, 1_000_000)
+PRICE_PERCENTILES = (10, 25, 50, 75, 90)
+
+STAT_COLUMNS = ["make", "model", "year", "count", "min_price", "max_price", "avg_price"] \
+    + [f"p{p}" for p in PRICE_PERCENTILES] + ["histogram"]
+
+# наборы группировки: по марке — все сочетания с моделью и годом, по всему каталогу — только год.
+# Модель без марки не сводим: одинаковые названия у разных марок — разные машины
+MAKE_GROUPING_SETS = [("mk", "md", "yr"), ("mk", "md"), ("mk", "yr"), ("mk",)]
+GLOBAL_GROUPING_SETS = [("yr",), ()]
+
+
+def _pg_insert_sql(grouping_sets: Sequence[Tuple[str, ...]], where: str = "") -> str:
+    grouped = {dim for s in grouping_sets for dim in s}
+    keys = [
+        f"CASE WHEN GROUPING({dim}) = 1 THEN '{ANY}' ELSE {dim} END" if dim in grouped else f"'{ANY}'"
+        for dim in ("mk", "md", "yr")
+    ]
+    sets = ", ".join("(" + ", ".join(s) + ")" for s in grouping_sets)
+    fractions = ", ".join(str(p / 100) for p in PRICE_PERCENTILES)
+    percentiles = ", ".join(f"round(pct[{i + 1}]::numeric)" for i in range(len(PRICE_PERCENTILES)))
+    buckets = ", ".join(f"count(*) FILTER (WHERE bucket = {i})" for i in range(len(PRICE_BUCKET_EDGES) + 1))
+    edges = ", ".join(map(str, PRICE_BUCKET_EDGES))
+    return f"""
+        INSERT INTO price_stats ({", ".join(STAT_COLUMNS)})
+        SELECT make, model, year, count, min_price, max_price, avg_price, {percentiles}, histogram
+        FROM (
+            SELECT {keys[0]} AS make, {keys[1]} AS model, {keys[2]} AS year,
+                   count(*) AS count, min(price) AS min_price, max(price) AS max_price,
+                   round(avg(price)) AS avg_price,
+                   percentile_cont(ARRAY[{fractions}]) WITHIN GROUP (ORDER BY price) AS pct,
+                   json_build_array({buckets})::text AS histogram
+            FROM (
+                SELECT coalesce(make, '') AS mk, coalesce(model, '') AS md,
+                       coalesce(year_num::text, '') AS yr, price,
+                       width_bucket(price, ARRAY[{edges}]::bigint[]) AS bucket
+                FROM engines
+                WHERE price IS NOT NULL {where}
+            ) e
+            GROUP BY GROUPING SETS ({sets})
+        ) s
+    """
+
+
+def pg_rebuild_sql(makes_param: Optional[str] = None, include_global: bool = True) -> List[str]:
+    """
+    Пересчет price_stats на Postgres одним проходом GROUPING SETS на набор.
+    makes_param — плейсхолдер массива марок (":makes" / "$1::text[]"), None — все марки.
+    Общие строки (make='*') требуют всех цен каталога: с include_global это полный проход
+    по engines на каждый пересчет, инкрементально (по маркам) считаются только строки марок.
+    """
+    if makes_param is None:
+        statements = [f"DELETE FROM price_stats WHERE make <> '{ANY}'", _pg_insert_sql(MAKE_GROUPING_SETS)]
+    else:
+        statements = [
+            f"DELETE FROM price_stats WHERE make = ANY({makes_param})",
+            _pg_insert_sql(MAKE_GROUPING_SETS, f"AND coalesce(make, '') = ANY({makes_param})"),
+        ]
+    if include_global:
+        statements += [f"DELETE FROM price_stats WHERE make = '{ANY}'", _pg_insert_sql(GLOBAL_GROUPING_SETS)]
+    return statements
+
+
+def _round(value: float) -> int:
+    # как round() в Postgres: половина — от нуля (цены неотрицательные)
+    return int(math.floor(value + 0.5))
+
+
+def _percentile(prices: List[int], p: int) -> int:
+    # percentile_cont: линейная интерполяция между соседними значениями
+    pos = p / 100 * (len(prices) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(prices) - 1)
+    return _round(prices[lo] + (prices[hi] - prices[lo]) * (pos - lo))
+
+
+def summarize_prices(key: Tuple[str, str, str], prices: List[int]) -> dict:
+    """Строка price_stats по отсортированным ценам группы — то же, что считает pg_rebuild_sql."""
+    histogram = [0] * (len(PRICE_BUCKET_EDGES) + 1)
+    for price in prices:
+        histogram[bisect_right(PRICE_BUCKET_EDGES, price)] += 1
+    row = dict(zip(("make", "model", "year"), key))
+    row.update(
+        count=len(prices),
+        min_price=prices[0],
+        max_price=prices[-1],
+        avg_price=_round(sum(prices) / len(prices)),
+        histogram=json.dumps(histogram),
+    )
+    for p in PRICE_PERCENTILES:
+        row[f"p{p}"] = _percentile(prices, p)
+    return row
+
+
+class StatsDAO:
+    async def rebuild(self,
+                      session: AsyncSession,
+                      makes: Optional[List[str]] = None,
+                      include_global: bool = True,
+                      ):
+        """
+        Пересчитывает строки price_stats марок makes (None — всех) и, если include_global,
+        общие строки по всему каталогу. Марка без значения — ''. Коммит — на вызывающем.
+        """
+        if session.bind.dialect.name == "postgresql":
+            for sql in pg_rebuild_sql(None if makes is None else ":makes", include_global):
+                stmt = text(sql)
+                if makes is not None and ":makes" in sql:
+                    stmt = stmt.bindparams(bindparam("makes", value=list(makes), type_=ARRAY(Text)))
+                await session.execute(stmt)
+            return
+        await self._rebuild_python(session, makes, include_global)
+
+    async def _rebuild_python(self,
+                              session: AsyncSession,
+                              makes: Optional[List[str]],
+                              include_global: bool,
+                              ):
+        # SQLite: без GROUPING SETS и percentile_cont, сводим в python
+        query = select(Engine.make, Engine.model, Engine.year_num, Engine.price) \
+            .where(Engine.price.isnot(None)) \
+            .order_by(Engine.price)
+        wanted = None if makes is None else set(makes)
+        if wanted is not None and not include_global:
+            query = query.where(make_key.in_(wanted))
+
+        groups: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+        for make, model, year_num, price in await session.execute(query):
+            mk, md, yr = make or "", model or "", "" if year_num is None else str(year_num)
+            if wanted is None or mk in wanted:
+                for key in ((mk, md, yr), (mk, md, ANY), (mk, ANY, yr), (mk, ANY, ANY)):
+                    groups[key].append(price)
+            if include_global:
+                for key in ((ANY, ANY, yr), (ANY, ANY, ANY)):
+                    groups[key].append(price)
+
+        if wanted is None:
+            await session.execute(delete(PriceStat).where(PriceStat.make != ANY))
+        else:
+            await session.execute(delete(PriceStat).where(PriceStat.make.in_(wanted)))
+        if include_global:
+            await session.execute(delete(PriceStat).where(PriceStat.make == ANY))
+        rows = [summarize_prices(key, prices) for key, prices in groups.items()]
+        if rows:
+            await session.execute(insert(PriceStat), rows)
+
+    async def get(self,
+                  session: AsyncSession,
+                  make: str = ANY,
+                  model: str = ANY,
+                  year: str = ANY,
+                  ) -> Optional[PriceStat]:
+        result = await session.execute(
+            select(PriceStat).where(PriceStat.make == make, PriceStat.model == model, PriceStat.year == year)
+        )
+        return result.scalar_one_or_none()
+
+    async def breakdown(self,
+                        session: AsyncSession,
+                        by: str,
+                        make: str = ANY,
+                        model: str = ANY,
+                        year: str = ANY,
+                        ) -> List[PriceStat]:
+        # строки, где измерение by конкретное, а остальные зафиксированы; '' (не указано) не отдаем
+        column = getattr(PriceStat, by)
+        fixed = {"make": make, "model": model, "year": year}
+        query = select(PriceStat).where(column.notin_([ANY, ""]))
+        for name, value in fixed.items():
+            if name != by:
+                query = query.where(getattr(PriceStat, name) == value)
+
+        result = await session.execute(query.order_by(column))
+        return list(result.scalars().all())
+
+
+stats_dao = StatsDAO()
@@ -1,12 +1,129 @@
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.config import DATABASE_URL, CATALOG_SNAPSHOT, SQL_ECHO, SLOW_QUERY_MS
+from core.metrics import Gauge, Histogram, ROWS_BUCKETS, WAIT_BUCKETS
+
+SQL_LATENCY = Histogram("db_statement_duration_seconds", "SQL statement execution time", labels=("operation",))
+SQL_ROWS = Histogram("db_statement_rows", "Rows returned or affected per SQL statement (when the driver reports rowcount)",
+                     labels=("operation",), buckets=ROWS_BUCKETS)
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+                      buckets=WAIT_BUCKETS)
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "EXPLAIN"}
+slow_log = logging.getLogger("sql.slow")
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # сколько запрос ждал соединение: при исчерпании пула время уходит сюда, а не в SQL
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
 
-from core.config import DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def snapshot_url(path: str) -> str:
+    # immutable=1: файл никогда не меняется на месте (новый снимок приходит через rename),
+    # SQLite не берет блокировок и не проверяет журнал
+    return f"sqlite+aiosqlite:///file:{os.path.abspath(path)}?mode=ro&immutable=1&uri=true"
+
+
+def _pool_options(url: str) -> dict:
+    # TimedQueuePool — только там, где SQLAlchemy и так взял бы очередь соединений;
+    # in-memory SQLite живет на StaticPool (одно соединение = одна база), его не трогаем
+    parsed = make_url(url)
+    if issubclass(parsed.get_dialect(_is_async=True).get_pool_class(parsed), AsyncAdaptedQueuePool):
+        return {"poolclass": TimedQueuePool}
+    return {}
+
+
+ENGINE_URL = snapshot_url(CATALOG_SNAPSHOT) if CATALOG_SNAPSHOT else DATABASE_URL
+engine = create_async_engine(ENGINE_URL, echo=SQL_ECHO, **_pool_options(ENGINE_URL))
 async_session = sessionmaker(engine, class_= AsyncSession, expire_on_commit = False)
 Base = declarative_base()
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_functions(dbapi_connection, connection_record):
+        # встроенный lower() в SQLite понимает только ASCII — без этого поиск не находит кириллицу
+        dbapi_connection.create_function("lower", 1, lambda s: s.lower() if isinstance(s, str) else s, deterministic=True)
+
+if CATALOG_SNAPSHOT:
+    # Снимок подменяется атомарно (os.replace), открытые соединения продолжают читать старый файл.
+    # Запоминаем inode файла у соединения и при выдаче из пула сверяем с текущим:
+    # не совпал — пул закрывает соединение и открывает новое, уже на новом снимке
+    def _snapshot_inode():
+        try:
+            return os.stat(CATALOG_SNAPSHOT).st_ino
+        except FileNotFoundError:
+            return None
+
+    @event.listens_for(engine.sync_engine, "do_connect")
+    def _snapshot_opening(dialect, connection_record, cargs, cparams):
+        # до открытия: если файл подменят между stat и open, лишний раз переоткроемся, но не застрянем на старом
+        connection_record.info["snapshot_inode"] = _snapshot_inode()
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _snapshot_checkout(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("snapshot_inode") != _snapshot_inode():
+            raise DisconnectionError("catalog snapshot was replaced")
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info["statement_started"] = time.perf_counter()
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("statement_started", time.perf_counter())
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else ""
+    if operation not in SQL_OPERATIONS:
+        operation = "OTHER"
+
+    SQL_LATENCY.observe(elapsed, operation)
+    # asyncpg отдает число строк и для SELECT (из статуса команды), sqlite для SELECT — -1:
+    # тогда строки не наблюдаем, в приватный буфер курсора драйвера не лезем
+    rows = cursor.rowcount
+    if rows is not None and rows >= 0:
+        SQL_ROWS.observe(rows, operation)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_log.warning("slow query %.1f ms: %s", elapsed * 1000, " ".join(statement.split())[:2000])
+
+
+def _pool_connections() -> dict:
+    # у NullPool/StaticPool счетчиков нет — тогда и метрики нет
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    return {
+        ("checked_out",): pool.checkedout(),
+        ("idle",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+        ("size",): pool.size(),
+    }
+
+def _pool_utilisation() -> dict:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {(): pool.checkedout() / capacity if capacity else 0.0}
+
+Gauge("db_pool_connections", "Pooled connections by state", _pool_connections, labels=("state",))
+Gauge("db_pool_utilisation", "Checked-out connections / (pool_size + max_overflow)", _pool_utilisation)
+
+
 async def get_session():
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, Text, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, Text, BigInteger, ForeignKey, Index, func, literal_column, DDL, event
 from sqlalchemy.orm import relationship
 from db.database import Base
+from core.normalize import normalize_code, split_oem, parse_year
 
 
 class Engine(Base):
@@ -17,7 +18,13 @@ class Engine(Base):
     stock_text = Column(Text, nullable=True)
     oem = Column(Text, nullable=True)
     description = Column(Text, nullable=True)
+    # engine_code без разделителей в верхнем регистре (core/normalize.py), заполняется при загрузке
+    engine_code_norm = Column(Text, nullable=True, index=True)
+    # year ("03.2011", "2005") числом: год и месяц, если он указан — для фильтров по диапазону
+    year_num = Column(Integer, nullable=True, index=True)
+    year_month = Column(Integer, nullable=True)
     images = relationship('EngineImage', back_populates='engine', cascade="all, delete-orphan")
+    oems = relationship('EngineOem', back_populates='engine', cascade="all, delete-orphan")
 
 class EngineImage(Base):
     __tablename__ = 'engine_images'
@@ -25,3 +32,108 @@ class EngineImage(Base):
     image_url = Column(Text, primary_key=True)
     sort_order = Column(Integer, nullable=False, default=0)
     engine = relationship('Engine', back_populates='images')
+
+class EngineOem(Base):
+    # нормализованные OEM-номера товара: Engine.oem может содержать несколько через запятую
+    __tablename__ = 'engine_oems'
+    oem_norm = Column(Text, primary_key=True)
+    product_id = Column(Integer, ForeignKey('engines.product_id', ondelete='CASCADE'), primary_key=True, index=True)
+    engine = relationship('Engine', back_populates='oems')
+
+class PriceStat(Base):
+    # сводка цен для /stats/prices, пересчитывается при импорте (см. dao/stats_dao.py).
+    # Ключ (make, model, year): '*' — "любой", '' — не указан; year — year_num строкой.
+    # Учитываются только товары с ценой.
+    __tablename__ = 'price_stats'
+    make = Column(Text, primary_key=True)
+    model = Column(Text, primary_key=True)
+    year = Column(Text, primary_key=True)
+    count = Column(BigInteger, nullable=False)
+    min_price = Column(BigInteger, nullable=False)
+    max_price = Column(BigInteger, nullable=False)
+    avg_price = Column(BigInteger, nullable=False)
+    # перцентили PRICE_PERCENTILES, интерполированные как percentile_cont
+    p10 = Column(BigInteger, nullable=False)
+    p25 = Column(BigInteger, nullable=False)
+    p50 = Column(BigInteger, nullable=False)
+    p75 = Column(BigInteger, nullable=False)
+    p90 = Column(BigInteger, nullable=False)
+    # json-массив: число товаров в каждой корзине PRICE_BUCKET_EDGES
+    histogram = Column(Text, nullable=False)
+
+class CatalogMeta(Base):
+    # одна строка (id=1): номер поколения каталога, растет при каждом импорте
+    __tablename__ = 'catalog_meta'
+    id = Column(Integer, primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+
+
+# Ключи сортировки для keyset-пагинации.
+# NULL заменяем крайним значением, чтобы ключ всегда был сравнимым кортежем
+# и строки без цены/марки уходили в конец (для марки — в начало).
+# Литералы инлайнятся в SQL, иначе Postgres не сопоставит выражение с индексом.
+PRICE_MAX = 9223372036854775807
+
+price_asc_key = func.coalesce(Engine.price, literal_column(str(PRICE_MAX)))
+price_desc_key = func.coalesce(Engine.price, literal_column("-1"))
+make_key = func.coalesce(Engine.make, literal_column("''"))
+model_key = func.coalesce(Engine.model, literal_column("''"))
+
+# Индексы под каждый порядок сортировки: (ключ, product_id).
+# У price_desc свой индекс: NULL там заменяется на -1, а не на PRICE_MAX, и это другое выражение.
+Index('ix_engines_price_asc', price_asc_key, Engine.product_id)
+Index('ix_engines_price_desc', price_desc_key, Engine.product_id)
+Index('ix_engines_make_model', make_key, model_key, Engine.product_id)
+
+# Типичный фильтр списка: марка/модель + диапазон годов и цен.
+# Все условия проверяются по индексу, count и оценки строк не читают таблицу.
+Index('ix_engines_make_model_year_price', Engine.make, Engine.model, Engine.year_num, Engine.price)
+
+# картинки товара по порядку одним проходом по индексу (см. _images_column в dao/engines_dao.py),
+# image_url в индексе — чтобы Postgres отвечал index-only scan без чтения таблицы
+Index('ix_engine_images_product_sort', EngineImage.product_id, EngineImage.sort_order, EngineImage.image_url)
+
+
+# Полнотекстовый поиск (только Postgres, на SQLite ищем через LIKE — см. EngineDAO.search_engines).
+# search_tsv — generated-колонка, в модели ее нет: обновляется самой БД при любой записи.
+# Коды и OEM — конфиг simple (без стемминга), title/description — russian.
+SEARCH_DDL = [
+    """
+    ALTER TABLE engines ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(engine_code, '') || ' ' || coalesce(oem, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'B') ||
+        setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_engines_search_tsv ON engines USING gin (search_tsv)",
+    # триграммы — для частичных совпадений кодов: '1JZ' найдет '1JZ-GTE'.
+    # pg_trgm из contrib есть не везде: без него ILIKE работает, просто без индекса
+    """
+    DO $$
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_engines_engine_code_trgm ON engines USING gin (engine_code gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_engines_oem_trgm ON engines USING gin (oem gin_trgm_ops);
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'pg_trgm is not available, trigram indexes skipped: %%', SQLERRM;
+    END
+    $$
+    """,
+]
+for ddl in SEARCH_DDL:
+    event.listen(Engine.__table__, 'after_create', DDL(ddl).execute_if(dialect='postgresql'))
+
+
+# Запись через ORM тоже держит нормализованные ключи в актуальном состоянии
+# (load_csv.py и scraper/db_sink.py пишут мимо ORM и считают их сами).
+@event.listens_for(Engine.engine_code, 'set')
+def _sync_engine_code_norm(target, value, oldvalue, initiator):
+    target.engine_code_norm = normalize_code(value)
+
+@event.listens_for(Engine.year, 'set')
+def _sync_year_num(target, value, oldvalue, initiator):
+    target.year_num, target.year_month = parse_year(value)
+
+@event.listens_for(Engine.oem, 'set')
+def _sync_engine_oems(target, value, oldvalue, initiator):
+    target.oems = [EngineOem(oem_norm=key) for key in split_oem(value)]
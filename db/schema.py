@@ -0,0 +1,94 @@
+"""
+Создание схемы БД отдельной командой (раньше create_all шел на старте каждого воркера):
+
+    python -m db.schema
+
+На существующей базе команда же и обновляет схему: create_all добавляет только новые таблицы,
+поэтому новые колонки и индексы уже существующих таблиц досоздаются здесь,
+а вычисляемые при загрузке ключи (DERIVED_FIELDS, engine_oems) заполняются у старых строк.
+"""
+import asyncio
+
+from sqlalchemy import DDL, and_, bindparam, exists, inspect, or_, select, update
+from sqlalchemy.schema import CreateIndex
+
+from core.normalize import derived_fields, split_oem
+from db.models import SEARCH_DDL, Engine, EngineOem  # импорт модуля заодно регистрирует таблицы в Base.metadata
+from db.database import engine, Base
+
+BACKFILL_BATCH = 1000
+
+
+def _add_missing_columns(conn) -> list:
+    # ADD COLUMN без значения по умолчанию годится только для nullable-колонок — других миграций у нас нет
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"cannot add NOT NULL column {table.name}.{column.name} to an existing table")
+            type_ = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {type_}")
+            added.append(f"{table.name}.{column.name}")
+        # не checkfirst: рефлексия не видит индексы по выражениям (ключи сортировки) на SQLite
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    return added
+
+
+def _backfill(conn) -> tuple:
+    # строки, загруженные до появления DERIVED_FIELDS / engine_oems; повторный запуск их уже не найдет
+    stale = or_(
+        and_(Engine.engine_code.isnot(None), Engine.engine_code_norm.is_(None)),
+        and_(Engine.year.isnot(None), Engine.year_num.is_(None)),
+    )
+    rows = conn.execute(select(Engine.product_id, Engine.engine_code, Engine.year).where(stale)).all()
+    changed = []
+    for product_id, engine_code, year in rows:
+        derived = derived_fields({"engine_code": engine_code, "year": year})
+        # нераспознанный год так и останется NULL — такие строки не переписываем
+        if derived["engine_code_norm"] is not None or derived["year_num"] is not None:
+            changed.append({"pid": product_id, **derived})
+    stmt = update(Engine.__table__).where(Engine.__table__.c.product_id == bindparam("pid"))
+    for i in range(0, len(changed), BACKFILL_BATCH):
+        conn.execute(stmt, changed[i:i + BACKFILL_BATCH])
+
+    no_oems = ~exists().where(EngineOem.product_id == Engine.product_id)
+    oems = [
+        {"product_id": product_id, "oem_norm": key}
+        for product_id, oem in conn.execute(select(Engine.product_id, Engine.oem).where(Engine.oem.isnot(None), no_oems))
+        for key in split_oem(oem)
+    ]
+    for i in range(0, len(oems), BACKFILL_BATCH):
+        conn.execute(EngineOem.__table__.insert(), oems[i:i + BACKFILL_BATCH])
+    return len(changed), len({row["product_id"] for row in oems})
+
+
+async def create_schema():
+    # create_all создает только недостающие таблицы/индексы, существующие не трогает
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        added = await conn.run_sync(_add_missing_columns)
+        if added:
+            print(f"added columns: {', '.join(added)}")
+        keys, oems = await conn.run_sync(_backfill)
+        if keys or oems:
+            print(f"backfilled: derived keys for {keys} engines, engine_oems for {oems} engines")
+        if conn.dialect.name == "postgresql":
+            # after_create в db/models.py срабатывает только на новой таблице engines;
+            # на существующей базе колонку и индексы поиска досоздаем здесь (все IF NOT EXISTS)
+            for ddl in SEARCH_DDL:
+                await conn.execute(DDL(ddl))
+
+
+async def main():
+    await create_schema()
+    await engine.dispose()
+    print("OK: schema is up to date")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
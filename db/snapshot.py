@@ -0,0 +1,113 @@
+"""
+Read-only снимок каталога для узлов без своей БД: один файл SQLite со всеми таблицами,
+которые читает API, и теми же индексами, что в db/models.py.
+
+    python -m db.snapshot /srv/catalog/catalog.sqlite    # из DATABASE_URL, после каждого импорта
+    CATALOG_SNAPSHOT=/srv/catalog/catalog.sqlite uvicorn main:app
+
+Снимок собирается во временный файл рядом и встает на место через os.replace:
+читатели видят либо старый файл, либо новый целиком. На узлы файл раскладывается так же —
+копия во временное имя в той же папке и rename. Работающий узел подхватывает новый снимок
+сам (см. db/database.py), поколение каталога в нем сбрасывает кэши.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.schema import CreateTable
+
+from core.config import DATABASE_URL
+import db.models  # noqa: F401  — регистрирует таблицы в Base.metadata
+from db.database import Base
+
+# таблицы, которые читает API; staging-таблицы импорта сюда не попадают
+SNAPSHOT_TABLES = ["catalog_meta", "engines", "engine_images", "engine_oems", "price_stats"]
+EXPORT_BATCH = 10_000
+
+
+def _target_engine(path: str):
+    target = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(target, "connect")
+    def _bulk_pragmas(dbapi_connection, connection_record):
+        # файл временный: при сбое его просто удаляем, журнал и fsync на каждую пачку не нужны
+        dbapi_connection.execute("PRAGMA journal_mode = OFF")
+        dbapi_connection.execute("PRAGMA synchronous = OFF")
+
+    return target
+
+
+async def export(path: str, source_url: str = DATABASE_URL) -> dict:
+    """Выгружает каталог из source_url в SQLite-файл path. Возвращает число строк по таблицам."""
+    path = os.path.abspath(path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    source = create_async_engine(source_url)
+    target = _target_engine(tmp)
+    tables = [Base.metadata.tables[name] for name in SNAPSHOT_TABLES]
+    counts = {}
+    try:
+        with target.begin() as out:
+            for table in tables:
+                out.execute(CreateTable(table))
+
+        async with source.connect() as conn:
+            # все таблицы из одного снимка MVCC: импорт, идущий параллельно, не разорвет engines и картинки
+            if source.dialect.name == "postgresql":
+                conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+            async with conn.begin():
+                for table in tables:
+                    started = time.perf_counter()
+                    counts[table.name] = 0
+                    # по первичному ключу: строки товара и его картинки лежат в файле рядом
+                    result = await conn.stream(select(table).order_by(*table.primary_key.columns))
+                    async for rows in result.partitions(EXPORT_BATCH):
+                        with target.begin() as out:
+                            out.execute(table.insert(), [dict(r._mapping) for r in rows])
+                        counts[table.name] += len(rows)
+                    print(f"{table.name}: {counts[table.name]} rows in {time.perf_counter() - started:.2f}s")
+
+        # индексы — после данных: построить один раз быстрее, чем поддерживать на каждой вставке
+        with target.begin() as out:
+            for table in tables:
+                for index in table.indexes:
+                    index.create(out)
+            out.exec_driver_sql("ANALYZE")
+        with target.connect() as out:
+            out.exec_driver_sql("VACUUM")
+            check = out.exec_driver_sql("PRAGMA quick_check").scalar()
+        if check != "ok":
+            raise RuntimeError(f"snapshot check failed: {check}")
+    except BaseException:
+        target.dispose()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        await source.dispose()
+
+    target.dispose()
+    os.replace(tmp, path)
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="snapshot file to write (replaced atomically)")
+    args = ap.parse_args()
+    if not DATABASE_URL:
+        raise SystemExit("DATABASE_URL is required to export a snapshot")
+
+    started = time.perf_counter()
+    counts = asyncio.run(export(args.path))
+    size = os.path.getsize(args.path) / 1024 / 1024
+    print(f"OK: {args.path}, {sum(counts.values())} rows, {size:.1f} MB in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import argparse
 import json
 import csv
+import re
 
 IN_FILE = "engines_mysakura.json"
 ENGINES_CSV = "engines.csv"
@@ -11,8 +13,26 @@ ENGINE_FIELDS = [
     "stock_text", "oem", "description"
 ]
 
-def main():
-    with open(IN_FILE, "r", encoding="utf-8") as f:
+# сколько строк копим перед нормализацией цен и записью в csv (режим --stream)
+BATCH_SIZE = 1000
+READ_CHUNK = 1 << 20
+WHITESPACE_RE = re.compile(r"[ \t\r\n]*")
+# хвост значения до разделителя: у числа/true/null конец виден только по разделителю
+TOKEN_TAIL_RE = re.compile(r"[^,\] \t\r\n]*")
+
+
+def normalize_price(price):
+    # защита: если вдруг price не int
+    if price is not None and not isinstance(price, int):
+        try:
+            return int(str(price).strip())
+        except:
+            return None
+    return price
+
+
+def main(in_file: str = IN_FILE):
+    with open(in_file, "r", encoding="utf-8") as f:
         data = json.load(f)
 
     # 1) engines.csv
@@ -30,12 +50,7 @@ def main():
             seen.add(pid)
 
             row = {k: item.get(k) for k in ENGINE_FIELDS}
-            # защита: если вдруг price не int
-            if row["price"] is not None and not isinstance(row["price"], int):
-                try:
-                    row["price"] = int(str(row["price"]).strip())
-                except:
-                    row["price"] = None
+            row["price"] = normalize_price(row["price"])
 
             w.writerow(row)
 
@@ -55,5 +70,162 @@ def main():
 
     print("OK: создано", ENGINES_CSV, "и", IMAGES_CSV)
 
+
+class ProductIdSet:
+    """
+    Компактное множество product_id: битовая карта (1 бит на id) вместо set()
+    с ~60 байтами на элемент. Карта страничная: страница на PAGE_IDS id заводится
+    при первом id из нее, поэтому одиночный большой id стоит одну страницу (64 КБ),
+    а не карту до него. Нечисловые и отрицательные id — в обычный set.
+    """
+    PAGE_IDS = 1 << 19
+
+    def __init__(self):
+        self._pages = {}
+        self._other = set()
+
+    def add(self, pid) -> bool:
+        # True если pid новый
+        if not isinstance(pid, int) or isinstance(pid, bool) or pid < 0:
+            if pid in self._other:
+                return False
+            self._other.add(pid)
+            return True
+
+        page_no, offset = divmod(pid, self.PAGE_IDS)
+        page = self._pages.get(page_no)
+        if page is None:
+            page = self._pages[page_no] = bytearray(self.PAGE_IDS >> 3)
+        byte, bit = offset >> 3, 1 << (offset & 7)
+        if page[byte] & bit:
+            return False
+        page[byte] |= bit
+        return True
+
+
+def iter_json_array(f, chunk_size: int = READ_CHUNK):
+    """
+    Отдает элементы JSON-массива по одному, читая файл кусками.
+    В памяти только текущий кусок и текущий элемент.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        # уже разобранное отрезаем только при дочитывании, а не после каждого элемента
+        buf, pos = buf[pos:] + chunk, 0
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            pos = WHITESPACE_RE.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return ""
+            more()
+
+    if next_char() != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+
+    while True:
+        ch = next_char()
+        if ch == "]":
+            return
+        if not ch:
+            raise ValueError("unexpected end of JSON array")
+        if ch == ",":
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            more()
+            continue
+        # число в конце куска могло оборваться ("12" из "12.5") — дочитываем до разделителя
+        tail = TOKEN_TAIL_RE.match(buf, end).end()
+        if tail == len(buf) and not eof:
+            more()
+            continue
+        if tail > end:
+            raise ValueError(f"invalid JSON array element: {buf[pos:tail][:80]!r}")
+        pos = end
+        yield item
+
+
+def iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _write_batch(engines_w, images_w, engines_batch: list, images_batch: list):
+    # цены нормализуем пачкой прямо перед записью
+    for row in engines_batch:
+        row["price"] = normalize_price(row["price"])
+    engines_w.writerows(engines_batch)
+    images_w.writerows(images_batch)
+    engines_batch.clear()
+    images_batch.clear()
+
+
+def main_stream(in_file: str = IN_FILE,
+                jsonl: bool = False,
+                batch_size: int = BATCH_SIZE,
+                ):
+    """
+    Потоковый вариант main(): один проход по входу, оба csv пишутся одновременно,
+    память не растет с размером файла. Картинки пишутся только для первого
+    вхождения product_id (как и сама строка engines).
+    """
+    with open(in_file, "r", encoding="utf-8") as src, \
+            open(ENGINES_CSV, "w", newline="", encoding="utf-8") as ef, \
+            open(IMAGES_CSV, "w", newline="", encoding="utf-8") as imf:
+        engines_w = csv.DictWriter(ef, fieldnames=ENGINE_FIELDS)
+        engines_w.writeheader()
+        images_w = csv.writer(imf)
+        images_w.writerow(["product_id", "image_url", "sort_order"])
+
+        seen = ProductIdSet()
+        engines_batch, images_batch = [], []
+        items = iter_jsonl(src) if jsonl else iter_json_array(src)
+        for item in items:
+            pid = item.get("product_id")
+            if not pid:
+                continue
+            if not seen.add(pid):
+                continue
+
+            engines_batch.append({k: item.get(k) for k in ENGINE_FIELDS})
+            for idx, url in enumerate(item.get("images") or []):
+                images_batch.append([pid, url, idx])
+
+            if len(engines_batch) >= batch_size:
+                _write_batch(engines_w, images_w, engines_batch, images_batch)
+
+        _write_batch(engines_w, images_w, engines_batch, images_batch)
+
+    print("OK: создано", ENGINES_CSV, "и", IMAGES_CSV)
+
+
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="engines json -> engines.csv + engine_images.csv")
+    ap.add_argument("--in", dest="in_file", default=IN_FILE)
+    ap.add_argument("--stream", action="store_true", help="constant-memory single pass")
+    ap.add_argument("--jsonl", action="store_true", help="input is one JSON object per line (implies --stream)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = ap.parse_args()
+
+    if args.stream or args.jsonl or args.in_file.endswith((".jsonl", ".ndjson")):
+        main_stream(args.in_file, jsonl=args.jsonl or args.in_file.endswith((".jsonl", ".ndjson")),
+                    batch_size=args.batch_size)
+    else:
+        main(args.in_file)
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import csv
+import sys
+import time
+
+import asyncpg
+
+from core.config import DATABASE_URL
+from core.normalize import DERIVED_FIELDS, derived_fields, split_oem
+from dao.stats_dao import pg_rebuild_sql
+from json_to_csv import ENGINES_CSV, IMAGES_CSV, ENGINE_FIELDS
+
+# в engines пишем поля из csv + вычисляемые при загрузке (нормализованные ключи)
+LOAD_ENGINE_FIELDS = ENGINE_FIELDS + DERIVED_FIELDS
+IMAGE_FIELDS = ["product_id", "image_url", "sort_order"]
+OEM_FIELDS = ["product_id", "oem_norm"]
+INT_FIELDS = {"product_id", "price", "sort_order"}
+
+ENGINES_STAGING = "engines_staging"
+IMAGES_STAGING = "engine_images_staging"
+OEMS_STAGING = "engine_oems_staging"
+
+# чтобы два импорта не писали в staging одновременно
+LOAD_LOCK_KEY = 4_242_001
+
+# описания бывают длиннее дефолтного лимита csv (128 КБ)
+csv.field_size_limit(sys.maxsize)
+
+
+def asyncpg_dsn(url: str) -> str:
+    # asyncpg не понимает драйвер в схеме sqlalchemy-урла
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def _convert(row: dict, fields: list) -> tuple:
+    values = []
+    for k in fields:
+        v = row.get(k)
+        if v is None or v == "":
+            values.append(None)
+        elif k in INT_FIELDS:
+            try:
+                values.append(int(v))
+            except ValueError:
+                values.append(None)
+        else:
+            values.append(v)
+    return tuple(values)
+
+
+def read_records(path: str, fields: list, counter: list, derive=None):
+    # читаем csv построчно и сразу отдаем в COPY — файл целиком в памяти не держим
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            record = _convert(row, fields)
+            if record[0] is None:
+                continue
+            if derive:
+                record += tuple(derive(dict(zip(fields, record))).values())
+            counter[0] += 1
+            yield record
+
+
+def read_oem_records(path: str, counter: list):
+    # второй проход по engines.csv: (product_id, нормализованный OEM) для engine_oems
+    for product_id, oem in read_records(path, ["product_id", "oem"], [0]):
+        for key in split_oem(oem):
+            counter[0] += 1
+            yield product_id, key
+
+
+def _merge_engines_sql() -> str:
+    cols = ", ".join(LOAD_ENGINE_FIELDS)
+    updates = [k for k in LOAD_ENGINE_FIELDS if k != "product_id"]
+    assignments = ", ".join(f"{k} = EXCLUDED.{k}" for k in updates)
+    old = ", ".join(f"engines.{k}" for k in updates)
+    new = ", ".join(f"EXCLUDED.{k}" for k in updates)
+    # неизменившиеся строки не переписываем: меньше WAL и мертвых версий
+    return f"""
+        INSERT INTO engines ({cols})
+        SELECT DISTINCT ON (product_id) {cols} FROM {ENGINES_STAGING}
+        ORDER BY product_id
+        ON CONFLICT (product_id) DO UPDATE SET {assignments}
+        WHERE ({old}) IS DISTINCT FROM ({new})
+    """
+
+
+MERGE_IMAGES_SQL = f"""
+    INSERT INTO engine_images (product_id, image_url, sort_order)
+    SELECT DISTINCT ON (s.product_id, s.image_url) s.product_id, s.image_url, coalesce(s.sort_order, 0)
+    FROM {IMAGES_STAGING} s
+    JOIN engines e ON e.product_id = s.product_id
+    ORDER BY s.product_id, s.image_url, s.sort_order
+    ON CONFLICT (product_id, image_url) DO UPDATE SET sort_order = EXCLUDED.sort_order
+    WHERE engine_images.sort_order IS DISTINCT FROM EXCLUDED.sort_order
+"""
+
+# у загруженных товаров картинки заменяются списком из файла целиком
+PRUNE_IMAGES_SQL = f"""
+    DELETE FROM engine_images i
+    WHERE i.product_id IN (SELECT product_id FROM {ENGINES_STAGING})
+      AND NOT EXISTS (
+          SELECT 1 FROM {IMAGES_STAGING} s
+          WHERE s.product_id = i.product_id AND s.image_url = i.image_url
+      )
+"""
+
+MERGE_OEMS_SQL = f"""
+    INSERT INTO engine_oems (product_id, oem_norm)
+    SELECT DISTINCT s.product_id, s.oem_norm
+    FROM {OEMS_STAGING} s
+    JOIN engines e ON e.product_id = s.product_id
+    ON CONFLICT DO NOTHING
+"""
+
+PRUNE_OEMS_SQL = f"""
+    DELETE FROM engine_oems o
+    WHERE o.product_id IN (SELECT product_id FROM {ENGINES_STAGING})
+      AND NOT EXISTS (
+          SELECT 1 FROM {OEMS_STAGING} s
+          WHERE s.product_id = o.product_id AND s.oem_norm = o.oem_norm
+      )
+"""
+
+# марки, чьи сводки цен меняет импорт: новые и прежние марки загружаемых товаров
+# (товар мог сменить марку). Считается до merge, пока в engines старые значения
+AFFECTED_MAKES_SQL = f"""
+    SELECT coalesce(make, '') FROM {ENGINES_STAGING}
+    UNION
+    SELECT coalesce(e.make, '') FROM engines e JOIN {ENGINES_STAGING} s ON s.product_id = e.product_id
+"""
+
+BUMP_GENERATION_SQL = """
+    INSERT INTO catalog_meta (id, generation) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET generation = catalog_meta.generation + 1
+    RETURNING generation
+"""
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:,.0f} rows/sec)"
+
+
+async def load(engines_csv: str = ENGINES_CSV, images_csv: str = IMAGES_CSV):
+    """
+    Загрузка каталога из csv (см. json_to_csv.py):
+    1) COPY обоих файлов в UNLOGGED staging-таблицы (без WAL, API их не видит);
+    2) одна транзакция: INSERT ... ON CONFLICT в engines, engine_images, engine_oems,
+       пересчет price_stats затронутых марок (общие строки make='*' — по всему каталогу) + bump поколения.
+    Upsert берет только построчные блокировки, читатели engines не ждут (MVCC)
+    и видят либо старый каталог, либо новый целиком после коммита.
+    """
+    conn = await asyncpg.connect(asyncpg_dsn(DATABASE_URL))
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", LOAD_LOCK_KEY):
+            raise RuntimeError("another catalog load is already running")
+
+        started = time.perf_counter()
+
+        # 1) staging: пересоздаем, чтобы структура всегда совпадала с боевыми таблицами
+        await conn.execute(f"""
+            DROP TABLE IF EXISTS {ENGINES_STAGING};
+            DROP TABLE IF EXISTS {IMAGES_STAGING};
+            DROP TABLE IF EXISTS {OEMS_STAGING};
+            CREATE UNLOGGED TABLE {ENGINES_STAGING} (LIKE engines INCLUDING DEFAULTS);
+            CREATE UNLOGGED TABLE {IMAGES_STAGING} (LIKE engine_images INCLUDING DEFAULTS);
+            CREATE UNLOGGED TABLE {OEMS_STAGING} (LIKE engine_oems INCLUDING DEFAULTS);
+        """)
+
+        engines_count, images_count, oems_count = [0], [0], [0]
+        t = time.perf_counter()
+        await conn.copy_records_to_table(
+            ENGINES_STAGING,
+            records=read_records(engines_csv, ENGINE_FIELDS, engines_count, derive=derived_fields),
+            columns=LOAD_ENGINE_FIELDS,
+        )
+        print("COPY engines:", _rate(engines_count[0], time.perf_counter() - t))
+
+        t = time.perf_counter()
+        await conn.copy_records_to_table(
+            IMAGES_STAGING,
+            records=read_records(images_csv, IMAGE_FIELDS, images_count),
+            columns=IMAGE_FIELDS,
+        )
+        print("COPY engine_images:", _rate(images_count[0], time.perf_counter() - t))
+
+        t = time.perf_counter()
+        await conn.copy_records_to_table(
+            OEMS_STAGING,
+            records=read_oem_records(engines_csv, oems_count),
+            columns=OEM_FIELDS,
+        )
+        print("COPY engine_oems:", _rate(oems_count[0], time.perf_counter() - t))
+
+        # 2) merge одной транзакцией
+        t = time.perf_counter()
+        async with conn.transaction():
+            makes = [r[0] for r in await conn.fetch(AFFECTED_MAKES_SQL)]
+            merged_engines = await conn.execute(_merge_engines_sql())
+            pruned = await conn.execute(PRUNE_IMAGES_SQL)
+            merged_images = await conn.execute(MERGE_IMAGES_SQL)
+            await conn.execute(PRUNE_OEMS_SQL)
+            merged_oems = await conn.execute(MERGE_OEMS_SQL)
+            for sql in pg_rebuild_sql("$1::text[]"):
+                args = (makes,) if "$1" in sql else ()
+                await conn.execute(sql, *args)
+            generation = await conn.fetchval(BUMP_GENERATION_SQL)
+        total = engines_count[0] + images_count[0] + oems_count[0]
+        print("MERGE:", _rate(total, time.perf_counter() - t))
+        print(f"  engines {merged_engines}, images {merged_images}, stale images {pruned}, oems {merged_oems}")
+        print(f"  price stats rebuilt for {len(makes)} makes")
+
+        await conn.execute(
+            f"DROP TABLE IF EXISTS {ENGINES_STAGING}; DROP TABLE IF EXISTS {IMAGES_STAGING}; DROP TABLE IF EXISTS {OEMS_STAGING};"
+        )
+        await conn.execute("ANALYZE engines; ANALYZE engine_images; ANALYZE engine_oems; ANALYZE price_stats;")
+
+        print(f"OK: catalog generation {generation}, total", _rate(total, time.perf_counter() - started))
+    finally:
+        await conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-load engines.csv / engine_images.csv into Postgres")
+    ap.add_argument("--engines", default=ENGINES_CSV)
+    ap.add_argument("--images", default=IMAGES_CSV)
+    args = ap.parse_args()
+    asyncio.run(load(args.engines, args.images))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,24 @@
 from fastapi import FastAPI
-from db.database import engine, Base
-from routes import engines, filters
+from core.metrics import MetricsMiddleware
+from routes import engines, filters, health, metrics, stats
+from services.warmup_service import warmup_service
 
 app = FastAPI(title="Engines API with SQLAlchemy")
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # схему на каждом старте не трогаем (CREATE_SCHEMA_ON_STARTUP / python -m db.schema),
+    # зато открываем соединения и греем фасеты и популярные списки в фоне:
+    # startup не ждет прогрева, готовность отдает /health/ready
+    warmup_service.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await warmup_service.stop()
 
 app.include_router(engines.router)
-app.include_router(filters.router)
\ No newline at end of file
+app.include_router(filters.router)
+app.include_router(stats.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
@@ -1,41 +1,211 @@
-from typing import Optional, List
+import zlib
+from typing import AsyncIterator, Optional, List
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.database import get_session
-from schemas.engine import EngineOut
-from services.engines_service import engines_service
+from schemas.engine import (
+    EngineOut, EngineSort, ExportFormat, EngineLookupIn, EngineLookupOut, EngineBatchOut, BATCH_MAX_IDS, PRODUCT_ID_MAX, ENGINE_LIST_JSON,
+)
+from services.engines_service import engines_service, parse_fields
 
 router = APIRouter(prefix="/engines", tags=["Engines"])
 
 
+FIELDS_DESCRIPTION = "card, full или поля через запятую: title,price,images"
+
+
+def _fields(value: Optional[str]):
+    try:
+        return parse_fields(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _json(content: bytes, response: Optional[Response] = None) -> Response:
+    # Готовые байты от pydantic-core отдаем как есть: так FastAPI не валидирует ответ
+    # повторно по response_model и не гоняет его через jsonable_encoder + json.dumps.
+    # response_model остается для схемы OpenAPI. Заголовки переносим из инжектированного response.
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
 @router.get("/", response_model=List[EngineOut])
-async def list_engines(session: AsyncSession = Depends(get_session),
+async def list_engines(response: Response,
+                       session: AsyncSession = Depends(get_session),
                        make: Optional[str] = Query(None),
                        model: Optional[str] = Query(None),
                        year: Optional[str] = Query(None),
                        price_min: Optional[int] = Query(None, ge=0),
                        price_max: Optional[int] = Query(None, ge=0),
+                       year_min: Optional[int] = Query(None, ge=1900, le=2100),
+                       year_max: Optional[int] = Query(None, ge=1900, le=2100),
                        limit: int = Query(20, ge=1, le=200),
                        offset: int = Query(0, ge=0),
+                       sort: EngineSort = Query("product_id"),
+                       cursor: Optional[str] = Query(None),
+                       images_limit: Optional[int] = Query(None, ge=0, le=50),
+                       fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
                        ):
-    return await engines_service.list_engines(
+    # cursor — непрозрачный токен из заголовка X-Next-Cursor предыдущей страницы
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="cursor and offset cannot be combined")
+    selected, preset_images_limit = _fields(fields)
+    if images_limit is None:
+        images_limit = preset_images_limit
+    try:
+        page = await engines_service.list_engines(
+            session=session,
+            make=make,
+            model=model,
+            year=year,
+            price_min=price_min,
+            price_max=price_max,
+            year_min=year_min,
+            year_max=year_max,
+            limit=limit,
+            offset=offset,
+            sort=sort,
+            cursor=cursor,
+            images_limit=images_limit,
+            fields=selected,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    _set_total(response, page)
+    # в ответе только запрошенные поля — форма ответа совпадает с fields
+    include = None if selected is None else {"__all__": set(selected)}
+    return _json(ENGINE_LIST_JSON.dump_json(page.items, include=include), response)
+
+def _set_total(response: Response, page):
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
+        response.headers["X-Total-Count-Exact"] = "true" if page.total_exact else "false"
+
+
+# статические пути объявляем до /{product_id}, иначе их перехватит он
+@router.get("/search", response_model=List[EngineOut])
+async def search_engines(response: Response,
+                         q: str = Query(..., min_length=1, max_length=200),
+                         session: AsyncSession = Depends(get_session),
+                         make: Optional[str] = Query(None),
+                         model: Optional[str] = Query(None),
+                         year: Optional[str] = Query(None),
+                         price_min: Optional[int] = Query(None, ge=0),
+                         price_max: Optional[int] = Query(None, ge=0),
+                         year_min: Optional[int] = Query(None, ge=1900, le=2100),
+                         year_max: Optional[int] = Query(None, ge=1900, le=2100),
+                         limit: int = Query(20, ge=1, le=200),
+                         offset: int = Query(0, ge=0),
+                         images_limit: Optional[int] = Query(None, ge=0, le=50),
+                         ):
+    page = await engines_service.search_engines(
         session=session,
+        q=q,
         make=make,
         model=model,
         year=year,
         price_min=price_min,
         price_max=price_max,
+        year_min=year_min,
+        year_max=year_max,
         limit=limit,
         offset=offset,
+        images_limit=images_limit,
+    )
+    _set_total(response, page)
+    return _json(ENGINE_LIST_JSON.dump_json(page.items), response)
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    # "gzip, deflate, br" / "gzip;q=0.8" / "*"; q=0 — явный отказ
+    for part in (accept_encoding or "").lower().replace(" ", "").split(","):
+        coding, _, q = part.partition(";q=")
+        if coding in ("gzip", "*"):
+            try:
+                return float(q or 1) > 0
+            except ValueError:
+                return False
+    return False
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # один gzip-поток на весь ответ; Z_SYNC_FLUSH после каждого куска — клиент получает
+    # и может распаковывать данные по ходу, а не после конца выгрузки
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/export")
+async def export_engines(format: ExportFormat = Query("ndjson"),
+                         make: Optional[str] = Query(None),
+                         model: Optional[str] = Query(None),
+                         year: Optional[str] = Query(None),
+                         price_min: Optional[int] = Query(None, ge=0),
+                         price_max: Optional[int] = Query(None, ge=0),
+                         year_min: Optional[int] = Query(None, ge=1900, le=2100),
+                         year_max: Optional[int] = Query(None, ge=1900, le=2100),
+                         accept_encoding: Optional[str] = Header(None),
+                         ):
+    # весь каталог одним ответом вместо тысяч страниц GET /engines: серверный курсор, постоянная память
+    chunks = engines_service.export_engines(
+        format,
+        make=make,
+        model=model,
+        year=year,
+        price_min=price_min,
+        price_max=price_max,
+        year_min=year_min,
+        year_max=year_max,
     )
+    headers = {"Content-Disposition": f'attachment; filename="engines.{format}"', "Vary": "Accept-Encoding"}
+    if _accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip(chunks)
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+@router.get("/batch", response_model=EngineBatchOut)
+async def get_engines_batch(ids: List[str] = Query(..., description="1,2,3 или ids=1&ids=2"),
+                            session: AsyncSession = Depends(get_session),
+                            images_limit: Optional[int] = Query(None, ge=0, le=50),
+                            ):
+    try:
+        product_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="ids is empty")
+    if len(product_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {BATCH_MAX_IDS} ids per request")
+    if not all(1 <= pid <= PRODUCT_ID_MAX for pid in product_ids):
+        raise HTTPException(status_code=400, detail=f"ids must be in 1..{PRODUCT_ID_MAX}")
+    batch = await engines_service.get_engines(session=session, product_ids=product_ids, images_limit=images_limit)
+    return _json(batch.model_dump_json())
+
+@router.post("/lookup", response_model=EngineLookupOut)
+async def lookup_engines(body: EngineLookupIn,
+                         session: AsyncSession = Depends(get_session),
+                         ):
+    # коды сравниваются без учета регистра и разделителей, см. core/normalize.py
+    found = await engines_service.lookup(session=session, codes=body.codes)
+    return _json(found.model_dump_json())
 
 @router.get("/{product_id}", response_model=EngineOut)
 async def get_engine(product_id: int,
                      session: AsyncSession = Depends(get_session),
+                     fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
                      ):
-    engine = await engines_service.get_engine(session=session, product_id=product_id)
+    # у одного товара пресет не ограничивает картинки: карточке товара нужны все
+    selected, _ = _fields(fields)
+    engine = await engines_service.get_engine(session=session, product_id=product_id, fields=selected)
     if not engine:
         raise HTTPException(status_code=404, detail="Engine not found")
-    return engine
+    return _json(engine.model_dump_json(include=None if selected is None else set(selected)))
@@ -1,28 +1,78 @@
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, Query, Depends, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from db.database import get_session
+from schemas.filters import FacetCountsOut
 from services.filters_service import filters_service
 
 router = APIRouter(prefix="/filters", tags=["Filters"])
 
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _conditional(response: Response, if_none_match: Optional[str], etag: str) -> Optional[Response]:
+    # фасеты меняются только с поколением каталога: клиент всегда ревалидирует по ETag
+    if _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+
 @router.get('/makes', response_model = List[str])
-async def get_makes(session: AsyncSession = Depends(get_session)
+async def get_makes(response: Response,
+                    session: AsyncSession = Depends(get_session),
+                    if_none_match: Optional[str] = Header(None)
                     ):
-    return await filters_service.get_makes(session)
+    index = await filters_service.get_index(session)
+    return _conditional(response, if_none_match, index.etag) or index.makes()
 
 @router.get('/models', response_model = List[str])
-async def get_models(session: AsyncSession = Depends(get_session),
-                     make: Optional[str] = Query(None)
+async def get_models(response: Response,
+                     session: AsyncSession = Depends(get_session),
+                     make: Optional[str] = Query(None),
+                     if_none_match: Optional[str] = Header(None)
                      ):
-    return await filters_service.get_models(session, make)
+    index = await filters_service.get_index(session)
+    return _conditional(response, if_none_match, index.etag) or index.models(make)
 
 @router.get('/years', response_model = List[str])
-async def get_years(session: AsyncSession = Depends(get_session),
+async def get_years(response: Response,
+                    session: AsyncSession = Depends(get_session),
                     make : Optional[str] = Query(None),
-                    model: Optional[str] = Query(None)
+                    model: Optional[str] = Query(None),
+                    if_none_match: Optional[str] = Header(None)
                     ):
-    return await filters_service.get_years(session, make, model)
-
+    index = await filters_service.get_index(session)
+    return _conditional(response, if_none_match, index.etag) or index.years(make, model)
 
 
+@router.get('/facets', response_model = FacetCountsOut)
+async def get_facets(response: Response,
+                     session: AsyncSession = Depends(get_session),
+                     make: Optional[str] = Query(None),
+                     model: Optional[str] = Query(None),
+                     year: Optional[str] = Query(None),
+                     price_min: Optional[int] = Query(None, ge=0),
+                     price_max: Optional[int] = Query(None, ge=0),
+                     year_min: Optional[int] = Query(None, ge=1900, le=2100),
+                     year_max: Optional[int] = Query(None, ge=1900, le=2100),
+                     if_none_match: Optional[str] = Header(None)
+                     ):
+    # марки, модели и годы со счетчиками под текущие фильтры GET /engines — вместо трех запросов к /filters/*
+    etag = await filters_service.etag(session)
+    return _conditional(response, if_none_match, etag) or await filters_service.get_facet_counts(
+        session,
+        make=make,
+        model=model,
+        year=year,
+        price_min=price_min,
+        price_max=price_max,
+        year_min=year_min,
+        year_max=year_max,
+    )
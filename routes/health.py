@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services.warmup_service import warmup_service
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def live():
+    # процесс жив и отвечает (даже если еще греется)
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready():
+    # трафик можно пускать только после прогрева (см. WarmupService)
+    if warmup_service.error:
+        return JSONResponse(status_code=503, content={"status": "warm-up failed", "error": warmup_service.error})
+    if not warmup_service.ready:
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+    return {"status": "ready", "warmup": warmup_service.timings}
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from core import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # формат Prometheus text exposition 0.0.4
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Query, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from db.database import get_session
+from schemas.stats import PriceStatsOut, StatsDimension
+from services.stats_service import stats_service
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get('/prices', response_model = PriceStatsOut)
+async def get_prices(session: AsyncSession = Depends(get_session),
+                     make: Optional[str] = Query(None),
+                     model: Optional[str] = Query(None),
+                     year: Optional[int] = Query(None, ge=1900, le=2100),
+                     ):
+    # count/min/max/avg/перцентили/гистограмма из price_stats, без агрегации по engines
+    if model and not make:
+        raise HTTPException(status_code=400, detail="model requires make")
+    return await stats_service.get_prices(session, make, model, year)
+
+@router.get('/prices/breakdown', response_model = List[PriceStatsOut])
+async def get_prices_breakdown(by: StatsDimension,
+                               session: AsyncSession = Depends(get_session),
+                               make: Optional[str] = Query(None),
+                               model: Optional[str] = Query(None),
+                               year: Optional[int] = Query(None, ge=1900, le=2100),
+                               ):
+    # та же сводка по каждому значению измерения by (например, по годам модели) одним запросом
+    if (by == "model" or (model and by != "make")) and not make:
+        raise HTTPException(status_code=400, detail="model requires make")
+    return await stats_service.get_breakdown(session, by, make, model, year)
@@ -1,5 +1,10 @@
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Dict, Optional, List, Literal
+from pydantic import BaseModel, Field, TypeAdapter
+
+# порядок сортировки списка двигателей, под каждый есть индекс (см. db/models.py)
+EngineSort = Literal["product_id", "price_asc", "price_desc", "make_model"]
+# формат GET /engines/export
+ExportFormat = Literal["ndjson", "csv"]
 
 
 class EngineBase(BaseModel):
@@ -21,3 +26,50 @@ class EngineOut(EngineBase):
 
     # позволяет pydantic понимать ORM-объекты
     model_config = {"from_attributes": True}
+
+# список EngineOut -> json-байты одним вызовом pydantic-core (см. routes/engines.py)
+ENGINE_LIST_JSON = TypeAdapter(List[EngineOut])
+
+# fields= у GET /engines и GET /engines/{product_id}: список полей EngineOut или имя пресета.
+# Пресет -> (поля, сколько картинок по умолчанию); None — все поля / все картинки
+ENGINE_FIELD_NAMES = list(EngineOut.model_fields)
+FIELD_PRESETS = {
+    # плитка каталога: название, цена и первая картинка
+    "card": (["product_id", "title", "make", "model", "year", "price", "currency", "stock_text", "images"], 1),
+    "full": (None, None),
+}
+
+class EnginePage(BaseModel):
+    items: List[EngineOut] = []
+    # курсор следующей страницы, None если это последняя
+    next_cursor: Optional[str] = None
+    # всего строк под фильтр; total_exact=False — это оценка планировщика
+    total: Optional[int] = None
+    total_exact: bool = True
+
+# сколько id можно запросить одним GET /engines/batch
+BATCH_MAX_IDS = 200
+# product_id — Integer PK: id вне диапазона int4 драйвер не примет (500), а не "не найдено"
+PRODUCT_ID_MAX = 2 ** 31 - 1
+
+
+class EngineBatchOut(BaseModel):
+    # в порядке запрошенных id, без повторов
+    items: List[EngineOut] = []
+    # id, которых нет в каталоге
+    missing: List[int] = []
+
+
+# сколько кодов можно прислать в одном POST /engines/lookup
+LOOKUP_MAX_CODES = 500
+
+
+class EngineLookupIn(BaseModel):
+    # OEM-номера и/или коды двигателей в любом написании: "19000-46150", "1jz-gte"
+    codes: List[str] = Field(..., min_length=1, max_length=LOOKUP_MAX_CODES)
+
+class EngineLookupOut(BaseModel):
+    # входной код (как прислали) -> найденные двигатели
+    results: Dict[str, List[EngineOut]] = {}
+    # коды, по которым ничего не нашлось (или пустые после нормализации)
+    missing: List[str] = []
@@ -0,0 +1,20 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class YearFacetCount(BaseModel):
+    # год выпуска (year_num), а не строка year вроде "03.2011"
+    value: int
+    count: int
+
+class FacetCountsOut(BaseModel):
+    # строк под все фильтры сразу (столько вернет GET /engines)
+    total: int = 0
+    # у каждого фасета свой фильтр не учитывается: "Toyota (1204), Nissan (830)" при выбранной Toyota
+    makes: List[FacetCount] = []
+    models: List[FacetCount] = []
+    years: List[YearFacetCount] = []
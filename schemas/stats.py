@@ -0,0 +1,26 @@
+from typing import Dict, Optional, List, Literal
+from pydantic import BaseModel
+
+# измерение разбивки GET /stats/prices/breakdown
+StatsDimension = Literal["make", "model", "year"]
+
+
+class PriceBucket(BaseModel):
+    price_from: int
+    # None — корзина без верхней границы
+    price_to: Optional[int] = None
+    count: int = 0
+
+class PriceStatsOut(BaseModel):
+    # None в make/model/year — "по всем"
+    make: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    # товаров с ценой; при count=0 остальные поля пустые
+    count: int = 0
+    min: Optional[int] = None
+    max: Optional[int] = None
+    avg: Optional[int] = None
+    # "p50" -> цена
+    percentiles: Dict[str, int] = {}
+    histogram: List[PriceBucket] = []
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, List, Set
+
+
+class WorkerPool:
+    """
+    Очередь задач + фиксированное число воркеров.
+    submit() можно звать из самих воркеров (например, страница каталога
+    находит новые страницы) — повторы отбрасываются.
+    """
+    def __init__(self,
+                 worker: Callable[[Hashable], Awaitable[None]],
+                 concurrency: int,
+                 ):
+        self.worker = worker
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.seen: Set[Hashable] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, item: Hashable) -> bool:
+        if item in self.seen:
+            return False
+        self.seen.add(item)
+        self.queue.put_nowait(item)
+        return True
+
+    async def _run(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self.worker(item)
+            except Exception as e:
+                # воркер сам решает, что делать с ошибкой; сюда долетает только непойманное
+                print(f"FAIL {item}: {e!r}")
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def join(self):
+        # ждем пустую очередь, затем гасим воркеров
+        self.start()
+        try:
+            await self.queue.join()
+        finally:
+            for t in self._tasks:
+                t.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import List
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from core.normalize import DERIVED_FIELDS, derived_fields, split_oem
+from db.database import async_session
+from db.models import Engine, EngineImage, EngineOem
+from json_to_csv import ENGINE_FIELDS
+from services.catalog_service import catalog_service
+from services.stats_service import stats_service
+
+DB_BATCH_SIZE = 200
+# новое поколение каталога сбрасывает кэши API (списки, FacetIndex, счетчики фасетов) —
+# во время обхода не чаще раза в столько секунд, в конце обхода — обязательно
+DB_BUMP_INTERVAL = 300.0
+
+
+class DbSink:
+    """
+    Пишет товары прямо в engines/engine_images/engine_oems пачками по batch_size:
+    upsert engines + замена списков картинок и OEM, одной транзакцией.
+    Товары появляются в API по ходу обхода, а не после него: поколение каталога поднимается
+    с пачкой, но не чаще раза в bump_interval (каждый bump — полный сброс кэшей API).
+    Сводки цен (price_stats) пересчитываются один раз в close() по маркам записанных пачек
+    (пересчет марки читает все ее цены, на каждую пачку это слишком дорого) — и при сбое тоже,
+    для того, что успело записаться; там же последний bump. Общие строки (make='*') каждый раз
+    считаются по всему каталогу.
+    """
+    def __init__(self,
+                 batch_size: int = DB_BATCH_SIZE,
+                 session_factory=async_session,
+                 bump_interval: float = DB_BUMP_INTERVAL,
+                 ):
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.bump_interval = bump_interval
+        self._bumped_at = None
+        # записанные пачки, которых API еще не видит (не было bump после них)
+        self._unbumped = False
+        self._batch: List = []
+        self._lock = asyncio.Lock()
+        self.written = 0
+        # марки, чьи сводки цен устарели ('' — без марки)
+        self._dirty_makes = set()
+
+    async def write(self, item):
+        if not item.product_id:
+            return
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            # забираем пачку до первого await — воркеры тем временем копят следующую
+            batch, self._batch = self._batch, []
+            if not batch:
+                return
+
+            # в пачке последняя версия товара побеждает
+            by_id = {item.product_id: item for item in batch}
+            engines = []
+            for item in by_id.values():
+                row = {k: getattr(item, k) for k in ENGINE_FIELDS}
+                row.update(derived_fields(row))
+                engines.append(row)
+            images = [
+                {"product_id": item.product_id, "image_url": url, "sort_order": idx}
+                for item in by_id.values()
+                for idx, url in enumerate(dict.fromkeys(item.images or []))
+            ]
+            oems = [
+                {"product_id": item.product_id, "oem_norm": key}
+                for item in by_id.values()
+                for key in split_oem(item.oem)
+            ]
+
+            try:
+                async with self.session_factory() as session:
+                    # прежние марки тоже: товар мог сменить марку
+                    old_makes = await session.execute(
+                        select(Engine.make).where(Engine.product_id.in_(list(by_id))).distinct()
+                    )
+                    dirty = {make or "" for make in old_makes.scalars()}
+                    dirty.update(row["make"] or "" for row in engines)
+
+                    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+
+                    stmt = insert(Engine).values(engines)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[Engine.product_id],
+                        set_={k: stmt.excluded[k] for k in ENGINE_FIELDS + DERIVED_FIELDS if k != "product_id"},
+                    )
+                    await session.execute(stmt)
+
+                    await session.execute(delete(EngineImage).where(EngineImage.product_id.in_(list(by_id))))
+                    if images:
+                        await session.execute(insert(EngineImage).values(images))
+
+                    await session.execute(delete(EngineOem).where(EngineOem.product_id.in_(list(by_id))))
+                    if oems:
+                        await session.execute(insert(EngineOem).values(oems))
+
+                    now = time.monotonic()
+                    bump = self._bumped_at is None or now - self._bumped_at >= self.bump_interval
+                    if bump:
+                        await catalog_service.bump(session)
+                    await session.commit()
+                self._dirty_makes |= dirty
+                if bump:
+                    self._bumped_at, self._unbumped = now, False
+                else:
+                    self._unbumped = True
+            except BaseException:
+                # пачку возвращаем в начало буфера: при сбое БД товары не теряются,
+                # их запишет следующий flush (или close)
+                self._batch[:0] = batch
+                raise
+
+            self.written += len(by_id)
+            print(f"DB: upserted {len(by_id)} engines, {len(images)} images (total {self.written})")
+
+    async def close(self):
+        try:
+            await self.flush()
+        finally:
+            # если последняя пачка не записалась, сводки уже записанных марок все равно не должны устареть
+            await self.rebuild_stats()
+
+    async def rebuild_stats(self):
+        # сводки и последний bump — одной транзакцией, как в load_csv.py
+        if not self._dirty_makes and not self._unbumped:
+            return
+        async with self.session_factory() as session:
+            if self._dirty_makes:
+                await stats_service.rebuild(session, sorted(self._dirty_makes))
+            generation = await catalog_service.bump(session)
+            await session.commit()
+        print(f"DB: price stats rebuilt for {len(self._dirty_makes)} makes, catalog generation {generation}")
+        self._dirty_makes.clear()
+        self._unbumped = False
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# на эти ответы сервер обычно говорит "попробуй позже"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _check_rate(rate: float):
+    # rate 0 — деление на ноль в acquire; "без лимита" так не задать
+    if not rate > 0:
+        raise ValueError(f"rate must be > 0 requests/sec, got {rate!r}")
+
+
+class TokenBucket:
+    """
+    rate токенов в секунду, не больше burst в запасе. Один запрос = один токен.
+    """
+    def __init__(self, rate: float, burst: float = 1.0):
+        _check_rate(rate)
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # лок держим и во время сна — ждущие встают в очередь по порядку
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostRateLimiter:
+    # отдельное ведро на каждый хост: вежливы к каждому сайту независимо
+    def __init__(self, rate: float, burst: float = 1.0):
+        _check_rate(rate)
+        self.rate = rate
+        self.burst = burst
+        # хост -> (rate, burst), если у хоста свой лимит (см. SourceAdapter.requests_per_second)
+        self._limits: Dict[str, tuple] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def set_rate(self, host: str, rate: float, burst: Optional[float] = None):
+        # до первого запроса к хосту: ведро создается лениво с этими параметрами
+        _check_rate(rate)
+        self._limits[host] = (rate, rate if burst is None else burst)
+        self._buckets.pop(host, None)
+
+    async def acquire(self, url: str):
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self._limits.get(host, (self.rate, self.burst))
+            bucket = self._buckets[host] = TokenBucket(rate, burst)
+        await bucket.acquire()
+
+
+def make_client(concurrency: int,
+                headers: Optional[Dict[str, str]] = None,
+                timeout: float = 30,
+                ) -> httpx.AsyncClient:
+    # один клиент на весь обход: keep-alive соединения переиспользуются между запросами
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(headers=headers, timeout=timeout, limits=limits)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Fetcher:
+    """
+    GET с лимитом запросов на хост и повторами на 429/5xx и сетевые ошибки.
+    Пауза между повторами — экспоненциальная с полным джиттером
+    (или Retry-After, если сервер его прислал).
+    """
+    def __init__(self,
+                 client: httpx.AsyncClient,
+                 limiter: HostRateLimiter,
+                 retries: int = 4,
+                 backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 ):
+        self.client = client
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = _retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        return min(delay, self.max_backoff)
+
+    async def get(self,
+                  url: str,
+                  headers: Optional[Dict[str, str]] = None,
+                  ) -> httpx.Response:
+        # статус не проверяем: вызывающему может быть интересен, например, 304
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire(url)
+            try:
+                r = await self.client.get(url, headers=headers, follow_redirects=True)
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                continue
+
+            if r.status_code in RETRY_STATUSES and attempt < self.retries:
+                await asyncio.sleep(self._delay(attempt, r.headers.get("Retry-After")))
+                continue
+            return r
+
+    async def get_text(self, url: str) -> str:
+        r = await self.get(url)
+        r.raise_for_status()
+        return r.text
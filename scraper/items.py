@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class EngineItem:
+    # общий формат товара для всех источников: его пишут sinks, json_to_csv.py и DbSink
+    source: str
+    source_url: str
+    product_id: Optional[int]
+    title: Optional[str]
+    make: Optional[str]
+    model: Optional[str]
+    year: Optional[str]
+    engine_code: Optional[str]
+    engine_type: Optional[str]  # можно будет вывести позже (petrol/diesel/unknown)
+    price: Optional[int]        # в рублях, если указано цифрами
+    currency: str
+    stock_text: Optional[str]
+    oem: Optional[str]
+    description: Optional[str]
+    images: List[str]
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from dataclasses import asdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from scraper.crawler import WorkerPool
+from scraper.http import Fetcher
+from scraper.items import EngineItem
+from scraper.sources.base import SourceAdapter
+from scraper.state import CrawlState, fetch_parsed
+
+
+async def crawl_source(fetcher: Fetcher,
+                       source: SourceAdapter,
+                       on_item: Callable[[EngineItem], Awaitable[None]],
+                       concurrency: int,
+                       state: Optional[CrawlState] = None,
+                       ) -> int:
+    """
+    Обход одного источника: страницы каталога и карточки качаются параллельно
+    (concurrency воркеров на каждый пул, общий лимит запросов на хост в fetcher).
+    Карточки начинают парситься, как только найдены на любой странице.
+    С state запросы условные, неизменившиеся страницы не разбираются заново,
+    а прерванный обход продолжается с места остановки (см. scraper/state.py).
+    Возвращает число найденных товаров.
+    """
+    done = 0
+    # ошибка записи (sink) — не ошибка товара: обход источника останавливается и она поднимается наверх
+    sink_error: Optional[BaseException] = None
+
+    async def scrape(url: str):
+        nonlocal done, sink_error
+        if sink_error:
+            return
+        try:
+            payload = await fetch_parsed(fetcher, state, url, lambda html: asdict(source.parse_product(html, url)))
+            item = EngineItem(**payload)
+        except Exception as e:
+            print(f"[{source.name} {done}/{len(products.seen)}] FAIL {url}: {e}")
+            return
+        try:
+            await on_item(item)
+        except Exception as e:
+            if sink_error is None:
+                sink_error = e
+                print(f"[{source.name}] sink failed, stopping crawl: {e!r}")
+            return
+        done += 1
+        print(f"[{source.name} {done}/{len(products.seen)}] OK {url}")
+
+    async def visit_page(url: str):
+        if sink_error:
+            return
+        try:
+            links = await fetch_parsed(fetcher, state, url, lambda html: source.parse_listing(html, url))
+        except Exception as e:
+            print(f"[{source.name}] FAIL page {url}: {e}")
+            return
+        for link in links["products"]:
+            products.submit(link)
+        for page in links["pages"]:
+            pages.submit(page)
+
+    products = WorkerPool(scrape, concurrency)
+    pages = WorkerPool(visit_page, concurrency)
+
+    products.start()
+    for url in source.start_urls():
+        pages.submit(url)
+    await pages.join()
+    print(f"[{source.name}] found products: {len(products.seen)} on {len(pages.seen)} pages")
+    await products.join()
+    if sink_error:
+        raise sink_error
+    return len(products.seen)
+
+
+async def crawl_sources(fetcher: Fetcher,
+                        sources: List[SourceAdapter],
+                        on_item: Callable[[EngineItem], Awaitable[None]],
+                        concurrency: int,
+                        state: Optional[CrawlState] = None,
+                        ) -> Dict[str, int]:
+    """
+    Все источники одновременно, товары — в один on_item. У каждого источника свои пулы воркеров,
+    лимит запросов — на хост (HostRateLimiter), поэтому источники не ждут друг друга
+    и общее время обхода — время самого медленного из них, а не сумма.
+    Падение одного источника не останавливает остальные; после того как все закончат,
+    первая ошибка поднимается (обход не считается завершенным). Возвращает источник -> число товаров.
+    """
+    for source in sources:
+        if source.requests_per_second:
+            for host in source.hosts:
+                fetcher.limiter.set_rate(host, source.requests_per_second)
+
+    async def run(source: SourceAdapter) -> int:
+        started = time.perf_counter()
+        try:
+            return await crawl_source(fetcher, source, on_item, concurrency, state)
+        finally:
+            print(f"[{source.name}] done in {time.perf_counter() - started:.1f}s")
+
+    results = await asyncio.gather(*(run(source) for source in sources), return_exceptions=True)
+    found: Dict[str, int] = {}
+    errors = []
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            print(f"[{source.name}] FAIL: {result!r}")
+            found[source.name] = 0
+            errors.append(result)
+        else:
+            found[source.name] = result
+    if errors:
+        raise errors[0]
+    return found
@@ -0,0 +1,57 @@
+import json
+from dataclasses import asdict
+from typing import List
+
+
+class NdjsonSink:
+    """
+    Пишет по строке JSON на товар и сразу сбрасывает на диск:
+    память не растет, а файл можно читать (json_to_csv.py --jsonl) еще во время обхода.
+    Файл на каждый обход пишется заново: возобновленный по --state обход тоже отдает
+    все товары (уже обработанные — из состояния), дописывание дало бы дубли.
+    """
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    async def write(self, item):
+        self._f.write(json.dumps(asdict(item), ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    async def close(self):
+        self._f.close()
+
+
+class JsonArraySink:
+    # старый формат: весь список одним json-массивом в конце обхода (держит все в памяти)
+    def __init__(self, path: str):
+        self.path = path
+        self._items: List[dict] = []
+
+    async def write(self, item):
+        self._items.append(asdict(item))
+
+    async def close(self):
+        self._items.sort(key=lambda r: r["source_url"])
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._items, f, ensure_ascii=False, indent=2)
+
+
+class FanoutSink:
+    def __init__(self, sinks: list):
+        self.sinks = sinks
+
+    async def write(self, item):
+        for sink in self.sinks:
+            await sink.write(item)
+
+    async def close(self):
+        for sink in self.sinks:
+            await sink.close()
+
+
+def file_sink(path: str):
+    # по расширению: .json — массив (как раньше), иначе NDJSON
+    if path.endswith(".json"):
+        return JsonArraySink(path)
+    return NdjsonSink(path)
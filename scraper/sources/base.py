@@ -0,0 +1,90 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from scraper.items import EngineItem
+
+
+def clean_int(s: str) -> Optional[int]:
+    s = s.replace(" ", "").replace("\xa0", "")
+    digits = re.sub(r"[^\d]", "", s)
+    return int(digits) if digits else None
+
+
+def guess_engine_type(engine_code: Optional[str], title: Optional[str]) -> Optional[str]:
+    # Заглушка: тип топлива на карточках не всегда явно есть.
+    # Позже можно расширить правилами (по словам "дизель", "diesel", "d4d" и т.п.)
+    text = f"{engine_code or ''} {title or ''}".lower()
+    if "диз" in text or "diesel" in text:
+        return "diesel"
+    if "бенз" in text or "petrol" in text:
+        return "petrol"
+    return "unknown"
+
+
+def _add_from_srcset(urls: Set[str], srcset: str):
+    # srcset: "url1 1x, url2 2x"
+    for part in srcset.split(","):
+        u = part.strip().split(" ")[0]
+        if u:
+            urls.add(u)
+
+
+def image_candidates(soup: BeautifulSoup) -> Set[str]:
+    # все url картинок из img-тегов, включая ленивую загрузку и srcset; отбор — filter_images источника
+    urls: Set[str] = set()
+    for img in soup.find_all("img"):
+        for attr in ("src", "data-src", "data-original", "data-lazy", "data-srcset"):
+            v = img.get(attr)
+            if not v:
+                continue
+            v = str(v).strip()
+            if attr in ("data-srcset",):
+                _add_from_srcset(urls, v)
+            else:
+                urls.add(v)
+
+        srcset = img.get("srcset")
+        if srcset:
+            _add_from_srcset(urls, str(srcset))
+    return urls
+
+
+class SourceAdapter:
+    """
+    Один сайт-источник каталога. Обход (scraper/scheduler.py) одинаков для всех,
+    от источника нужны только:
+    - start_urls() — страницы каталога, с которых начинается обход;
+    - parse_listing() — discovery: карточки и другие страницы каталога на странице;
+    - parse_product() — разбор карточки в EngineItem;
+    - filter_images() — какие из картинок карточки — фото самого товара
+      (parse_product источника отдает ему все кандидаты из image_candidates).
+    parse_* вызываются на готовом HTML и не ходят в сеть: их результат кэшируется в CrawlState.
+    """
+    name: str = ""
+    default_start_url: str = ""
+    # свой лимит запросов в секунду на хосты источника; None — общий (--rps)
+    requests_per_second: Optional[float] = None
+
+    def __init__(self, start_url: Optional[str] = None):
+        # start_url можно переопределить, например, чтобы направить обход на локальный стаб
+        self.start_url = start_url or self.default_start_url
+
+    def start_urls(self) -> List[str]:
+        return [self.start_url]
+
+    @property
+    def hosts(self) -> Set[str]:
+        return {urlsplit(url).netloc for url in self.start_urls()}
+
+    def parse_listing(self, html: str, url: str) -> Dict[str, List[str]]:
+        """{"products": [url карточки, ...], "pages": [url страницы каталога, ...]}"""
+        raise NotImplementedError
+
+    def parse_product(self, html: str, url: str) -> EngineItem:
+        raise NotImplementedError
+
+    def filter_images(self, urls: Iterable[str]) -> List[str]:
+        return sorted(set(urls))
@@ -0,0 +1,277 @@
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+
+from scraper.items import EngineItem
+from scraper.sources.base import SourceAdapter, clean_int, guess_engine_type, image_candidates
+
+BASE = "https://mysakura.ru"
+
+CATALOG_PATH = "/catalog/dvigatel"
+CATALOG_URL = urljoin(BASE, CATALOG_PATH)
+
+PRODUCT_URL_RE = re.compile(r"^/product/\d+/?$")
+PAGE_NUM_RE = re.compile(r"([?&]page=)(\d+)")
+
+YACLOUD_PREFIX = "https://storage.yandexcloud.net/mysakura/"
+IMG_EXT_RE = re.compile(r"\.(jpg|jpeg|png|webp)(\?|$)", re.I)
+
+DESCRIPTION_RE = re.compile(r"(Пробег.*?)(?:Характеристики товара|Отзывы о товаре|##|$)", re.DOTALL)
+PRICE_RE = re.compile(r"\b(\d[\d \xa0]{2,}\d)\b")
+
+# поле EngineItem -> метка в блоке 'Характеристики товара'
+SPEC_LABELS = {
+    "make": "Марка",
+    "model": "Модель",
+    "year": "Год",
+    "engine_code": "Двигатель",
+    "oem": "OEM",
+    "stock_text": "Наличие",
+}
+_SPEC_ALT = "|".join(re.escape(label) for label in SPEC_LABELS.values())
+SPEC_ANY_RE = re.compile(rf"^({_SPEC_ALT})\s*:?\s*$")
+SPEC_STRICT_RE = re.compile(rf"^({_SPEC_ALT})\s*:\s*$")
+SPEC_LOOSE_RE = re.compile(rf"^({_SPEC_ALT})\s*:?$")
+
+# блоки на карточке с фото других товаров
+NOT_PRODUCT_CLASSES = ["slider_additional_parts", "additional_parts"]
+
+# Если знаешь точный файл-заглушку, добавь сюда кусок имени (например 'no_photo', 'placeholder' и т.п.)
+PLACEHOLDER_HINTS = ("placeholder", "no_photo", "no-photo", "nophoto", "stub")
+
+
+def extract_product_links(html: str, base: str = BASE) -> Set[str]:
+    soup = BeautifulSoup(html, "lxml")
+    links: Set[str] = set()
+    for a in soup.find_all("a", href=True):
+        href = a["href"].strip()
+        if PRODUCT_URL_RE.match(href):
+            links.add(urljoin(base, href))
+    return links
+
+
+def extract_pagination_links(html: str, base: str = BASE, catalog_path: str = CATALOG_PATH) -> Set[str]:
+    # Вариант попроще: собираем все ссылки каталога с ?page=
+    soup = BeautifulSoup(html, "lxml")
+    pages: Set[str] = set()
+    for a in soup.find_all("a", href=True):
+        href = a["href"].strip()
+        if href.startswith(catalog_path) and "page=" in href:
+            pages.add(urljoin(base, href))
+    return pages
+
+
+def expand_pagination(page_links: Set[str]) -> Set[str]:
+    """
+    Пагинация обычно показывает окно "1 2 3 ... 57". Берем ссылку с максимальным
+    номером как шаблон и сразу достраиваем все страницы 2..max — их можно качать
+    параллельно, не дожидаясь обхода по цепочке.
+    """
+    best, last = None, 0
+    for url in page_links:
+        m = PAGE_NUM_RE.search(url)
+        if m and int(m.group(2)) > last:
+            best, last = url, int(m.group(2))
+    if best is None:
+        return set(page_links)
+    return set(page_links) | {PAGE_NUM_RE.sub(rf"\g<1>{n}", best, count=1) for n in range(2, last + 1)}
+
+
+def extract_field_from_specs(soup: BeautifulSoup, label_ru: str) -> Optional[str]:
+    """
+    На карточке есть блок 'Характеристики товара' и далее пары:
+    'Марка:' -> 'Audi', 'Модель:' -> 'A6', 'Год:' -> '03.2011', ...
+    Мы ищем текст метки и берем ближайшее "значение" рядом в DOM.
+    """
+    label = label_ru.strip().rstrip(":")
+    # Находим элемент, где встречается 'Марка:' как текст
+    node = soup.find(string=re.compile(rf"^{re.escape(label)}\s*:\s*$"))
+    if not node:
+        # иногда может быть без двоеточия в узле — подстраховка
+        node = soup.find(string=re.compile(rf"^{re.escape(label)}\s*:?$"))
+    if not node:
+        return None
+    return _spec_value_after(node)
+
+
+def _spec_value_after(node) -> Optional[str]:
+    # Часто значение идет в следующем элементе
+    el = node.parent
+    # пробуем next elements
+    for _ in range(10):
+        el = el.find_next()
+        if el and el.get_text(strip=True):
+            val = el.get_text(" ", strip=True)
+            # отсекаем если случайно снова метка
+            if val.endswith(":"):
+                continue
+            return val
+    return None
+
+
+def extract_specs(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+    """
+    Все поля из 'Характеристики товара' за один обход дерева (вместо обхода на каждую метку).
+    Поле -> значение, как у extract_field_from_specs: метка с двоеточием важнее метки без него.
+    """
+    strict: Dict[str, object] = {}
+    loose: Dict[str, object] = {}
+    for node in soup.find_all(string=SPEC_ANY_RE):
+        label = SPEC_ANY_RE.search(node).group(1)
+        if label not in strict and SPEC_STRICT_RE.search(node):
+            strict[label] = node
+        if label not in loose and SPEC_LOOSE_RE.search(node):
+            loose[label] = node
+
+    specs: Dict[str, Optional[str]] = {}
+    for field, label in SPEC_LABELS.items():
+        node = strict.get(label) or loose.get(label)
+        specs[field] = _spec_value_after(node) if node is not None else None
+    return specs
+
+
+def extract_title(soup: BeautifulSoup) -> Optional[str]:
+    h1 = soup.find("h1")
+    if h1:
+        return h1.get_text(" ", strip=True)
+    return None
+
+
+def extract_description(soup: BeautifulSoup) -> Optional[str]:
+    # На карточке перед табами/комментарием есть большой текст (пробег/комплектность)
+    # Берем первый крупный текстовый блок после заголовка — эвристика:
+    return description_from_text(soup.get_text("\n", strip=True))
+
+
+def description_from_text(text: str) -> Optional[str]:
+    # ограничим до разумного: ищем строку со словом "Пробег" как в примере
+    m = DESCRIPTION_RE.search(text)
+    if m:
+        return m.group(1).strip()
+    return None
+
+
+def extract_price(soup: BeautifulSoup) -> Optional[int]:
+    return price_from_text(soup.get_text(" ", strip=True))
+
+
+def price_from_text(text: str) -> Optional[int]:
+    # На карточке встречается цена "120 000" и "120000" рядом
+    # Возьмем первую "разумную" цену: 4-7 цифр
+    m = PRICE_RE.search(text)
+    if not m:
+        return None
+    return clean_int(m.group(1))
+
+
+def extract_product_id(url: str) -> Optional[int]:
+    m = re.search(r"/product/(\d+)", url)
+    return int(m.group(1)) if m else None
+
+
+def extract_images_from_html(html: str) -> list[str]:
+    return extract_images(BeautifulSoup(html, "lxml"))
+
+
+def extract_images(soup: BeautifulSoup,
+                   pick: Optional[Callable[[Iterable[str]], List[str]]] = None,
+                   ) -> list[str]:
+    # ВНИМАНИЕ: вырезает чужие блоки из soup — звать последним
+    # 1) Вырезаем блоки, где точно НЕ фото текущего товара
+    # (в твоём HTML был slider_additional_parts — это “вам может понадобиться”)
+    # (селектор ".slider_additional_parts, .additional_parts" — поиском по классу, soupsieve заметно медленнее)
+    for bad in soup.find_all(class_=NOT_PRODUCT_CLASSES):
+        bad.decompose()
+
+    # 2) Собираем кандидаты из img-тегов, 3) оставляем фото товара (pick — filter_images адаптера)
+    return (pick or filter_images)(image_candidates(soup))
+
+
+def filter_images(urls: Iterable[str]) -> List[str]:
+    # берём только mysakura в yandexcloud + форматы картинок + убираем заглушки
+    clean = []
+    for u in urls:
+        if not u.startswith(YACLOUD_PREFIX):
+            continue
+        if not IMG_EXT_RE.search(u):
+            continue
+        low = u.lower()
+        if any(h in low for h in PLACEHOLDER_HINTS):
+            continue
+        clean.append(u)
+
+    # Стабильный порядок
+    return sorted(set(clean))
+
+
+def parse_product(html: str,
+                  url: str,
+                  pick_images: Optional[Callable[[Iterable[str]], List[str]]] = None,
+                  ) -> EngineItem:
+    """
+    Один разбор страницы: одно дерево, один проход по характеристикам,
+    один проход по тексту (из него и описание, и цена), картинки — из того же дерева.
+    pick_images — отбор фото товара из кандидатов (MysakuraSource передает свой filter_images).
+    """
+    soup = BeautifulSoup(html, "lxml")
+
+    title = extract_title(soup)
+
+    specs = extract_specs(soup)
+    make = specs["make"]
+    model = specs["model"]
+    year = specs["year"]
+    engine_code = specs["engine_code"]
+    oem = specs["oem"]
+    stock_text = specs["stock_text"]
+
+    # get_text(sep, strip=True) == sep.join(stripped_strings)
+    strings = list(soup.stripped_strings)
+    description = description_from_text("\n".join(strings))
+    price = price_from_text(" ".join(strings))
+
+    images = extract_images(soup, pick_images)
+
+    return EngineItem(
+        source=MysakuraSource.name,
+        source_url=url,
+        product_id=extract_product_id(url),
+        title=title,
+        make=make,
+        model=model,
+        year=year,
+        engine_code=engine_code,
+        engine_type=guess_engine_type(engine_code, title),
+        price=price,
+        currency="RUB",
+        stock_text=stock_text,
+        oem=oem,
+        description=description,
+        images=images,
+    )
+
+
+class MysakuraSource(SourceAdapter):
+    name = "mysakura"
+    default_start_url = CATALOG_URL
+
+    def __init__(self, start_url: Optional[str] = None):
+        super().__init__(start_url)
+        # base/путь каталога берем из самого url — так обход можно направить на локальный стаб
+        self.base = urljoin(self.start_url, "/")
+        self.catalog_path = urlsplit(self.start_url).path
+
+    def parse_listing(self, html: str, url: str) -> Dict[str, List[str]]:
+        return {
+            "products": sorted(extract_product_links(html, self.base)),
+            "pages": sorted(expand_pagination(extract_pagination_links(html, self.base, self.catalog_path))),
+        }
+
+    def parse_product(self, html: str, url: str) -> EngineItem:
+        # отбор картинок — через адаптер, чтобы переопределенный filter_images работал
+        return parse_product(html, url, self.filter_images)
+
+    def filter_images(self, urls: Iterable[str]) -> List[str]:
+        return filter_images(urls)
@@ -0,0 +1,26 @@
+from typing import Dict, List, Optional, Type
+
+from scraper.sources.base import SourceAdapter
+from scraper.sources.mysakura import MysakuraSource
+
+# имя источника -> адаптер; новый сайт = новый модуль в scraper/sources/ + строка здесь
+SOURCES: Dict[str, Type[SourceAdapter]] = {
+    MysakuraSource.name: MysakuraSource,
+}
+
+
+def make_sources(specs: Optional[List[str]] = None) -> List[SourceAdapter]:
+    """
+    Адаптеры по списку "имя" или "имя=start_url" (как в --source); пусто — все источники.
+    """
+    if not specs:
+        return [cls() for cls in SOURCES.values()]
+
+    sources: List[SourceAdapter] = []
+    for spec in specs:
+        name, _, start_url = spec.partition("=")
+        cls = SOURCES.get(name.strip())
+        if cls is None:
+            raise ValueError(f"unknown source {name!r}, expected one of: {', '.join(SOURCES)}")
+        sources.append(cls(start_url.strip() or None))
+    return sources
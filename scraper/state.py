@@ -0,0 +1,152 @@
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from scraper.http import Fetcher
+
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    payload TEXT,
+    fetched_at REAL,
+    run_id INTEGER
+);
+"""
+
+
+@dataclass
+class UrlState:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    payload: Any
+    run_id: Optional[int]
+
+
+class CrawlState:
+    """
+    Состояние обхода на диске (sqlite): по каждому url — ETag, Last-Modified,
+    хэш содержимого и результат разбора. Упавший обход при следующем запуске
+    продолжается с того же места: url, уже обработанные в незавершенном прогоне,
+    повторно не запрашиваются.
+    Методы синхронные и зовутся из воркеров в event loop, поэтому записи коммитятся
+    пачками (commit_every записей или раз в commit_interval секунд) — fsync на каждый url
+    держал бы весь обход. При жестком падении процесса теряется не больше одной пачки:
+    эти url просто запросятся заново.
+    """
+    def __init__(self, path: str, commit_every: int = COMMIT_EVERY, commit_interval: float = COMMIT_INTERVAL):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.run_id: Optional[int] = None
+        self.resumed = False
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._pending = 0
+        self._committed_at = time.monotonic()
+
+    def begin_run(self) -> int:
+        row = self.db.execute("SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        if row:
+            self.run_id, self.resumed = row[0], True
+        else:
+            cur = self.db.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),))
+            self.run_id, self.resumed = cur.lastrowid, False
+        self.db.commit()
+        return self.run_id
+
+    def finish_run(self):
+        self.db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+        self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self._pending = 0
+        self._committed_at = time.monotonic()
+
+    def get(self, url: str) -> Optional[UrlState]:
+        row = self.db.execute(
+            "SELECT url, etag, last_modified, content_hash, payload, run_id FROM urls WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        payload = json.loads(row[4]) if row[4] is not None else None
+        return UrlState(row[0], row[1], row[2], row[3], payload, row[5])
+
+    def save(self, url: str, etag: Optional[str], last_modified: Optional[str],
+             content_hash: Optional[str], payload: Any):
+        self.db.execute(
+            """INSERT INTO urls (url, etag, last_modified, content_hash, payload, fetched_at, run_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,
+                   content_hash = excluded.content_hash, payload = excluded.payload,
+                   fetched_at = excluded.fetched_at, run_id = excluded.run_id""",
+            (url, etag, last_modified, content_hash, json.dumps(payload, ensure_ascii=False), time.time(), self.run_id),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every or time.monotonic() - self._committed_at >= self.commit_interval:
+            self.commit()
+
+    def close(self):
+        # в том числе после исключения/Ctrl+C: сохраненное до сбоя не пропадает
+        self.commit()
+        self.db.close()
+
+
+async def fetch_parsed(fetcher: Fetcher,
+                       state: Optional[CrawlState],
+                       url: str,
+                       parse: Callable[[str], Any],
+                       ) -> Any:
+    """
+    Скачать и разобрать url с учетом состояния:
+    - уже обработан в текущем (возобновленном) прогоне -> результат из состояния, без запроса;
+    - условный запрос (If-None-Match / If-Modified-Since), на 304 — разбор не нужен;
+    - 200 с тем же хэшем содержимого -> тоже берем прошлый разбор.
+    parse должен возвращать json-сериализуемое значение.
+    """
+    if state is None:
+        return parse(await fetcher.get_text(url))
+
+    prev = state.get(url)
+    if prev and prev.payload is not None and prev.run_id == state.run_id:
+        return prev.payload
+
+    headers = {}
+    if prev and prev.payload is not None:
+        if prev.etag:
+            headers["If-None-Match"] = prev.etag
+        if prev.last_modified:
+            headers["If-Modified-Since"] = prev.last_modified
+
+    r = await fetcher.get(url, headers=headers or None)
+    if r.status_code == 304 and prev:
+        state.save(url, r.headers.get("ETag", prev.etag), r.headers.get("Last-Modified", prev.last_modified),
+                   prev.content_hash, prev.payload)
+        return prev.payload
+
+    r.raise_for_status()
+    content_hash = hashlib.sha1(r.content).hexdigest()
+    if prev and prev.payload is not None and prev.content_hash == content_hash:
+        payload = prev.payload
+    else:
+        payload = parse(r.text)
+    state.save(url, r.headers.get("ETag"), r.headers.get("Last-Modified"), content_hash, payload)
+    return payload
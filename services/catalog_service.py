@@ -0,0 +1,35 @@
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import CATALOG_CHECK_SECONDS
+from dao.catalog_dao import catalog_dao
+
+
+class CatalogService:
+    """
+    Поколение каталога меняется только при импорте, поэтому в БД за ним ходим
+    не чаще раза в CATALOG_CHECK_SECONDS, в остальное время отдаем запомненное.
+    """
+    def __init__(self):
+        self._generation = None
+        self._checked_at = 0.0
+
+    async def generation(self,
+                         session: AsyncSession,
+                         force: bool = False,
+                         ) -> int:
+        now = time.monotonic()
+        if force or self._generation is None or now - self._checked_at >= CATALOG_CHECK_SECONDS:
+            self._generation = await catalog_dao.get_generation(session)
+            self._checked_at = now
+        return self._generation
+
+    async def bump(self,
+                   session: AsyncSession,
+                   ) -> int:
+        self._generation = await catalog_dao.bump_generation(session)
+        self._checked_at = time.monotonic()
+        return self._generation
+
+
+catalog_service = CatalogService()
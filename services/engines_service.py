@@ -1,18 +1,107 @@
-from typing import Optional, List
+import base64
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from dao.engines_dao import engine_dao   #мпортируем наш dao
-from schemas.engine import EngineOut
+from core.cache import CacheBackend, ReadThroughCache, make_backend
+from core.config import EXACT_COUNT_THRESHOLD
+from core.normalize import normalize_code
+from dao.engines_dao import ENGINE_COLUMNS, SORT_KEY_TYPES, engine_dao   #мпортируем наш dao
+from db.database import async_session
+from schemas.engine import EngineOut, EnginePage, EngineLookupOut, EngineBatchOut, ENGINE_FIELD_NAMES, FIELD_PRESETS
+from services.catalog_service import catalog_service
+
+
+# выгрузка GET /engines/export: колонки engines в порядке ENGINE_COLUMNS (та же раскладка,
+# что у engines.csv из json_to_csv.py) + картинки товара
+EXPORT_ENGINE_FIELDS = [c.key for c in ENGINE_COLUMNS]
+EXPORT_FIELDS = EXPORT_ENGINE_FIELDS + ["images"]
+# в csv картинки одной ячейкой через пробел (в url пробелов нет)
+EXPORT_IMAGES_SEPARATOR = " "
+# строк в пачке курсора и в одном куске ответа
+EXPORT_BATCH = 1000
+
+
+# поля EngineOut: в строках DAO бывают служебные колонки (total, code), их в ответ не берем
+OUT_FIELDS = frozenset(ENGINE_FIELD_NAMES)
+
+
+def normalize_filters(filters: dict) -> dict:
+    # " Toyota " и "Toyota", "" и None — один и тот же фильтр
+    return {k: (v.strip() or None) if isinstance(v, str) else v for k, v in filters.items()}
+
+
+def parse_fields(value: Optional[str]) -> Tuple[Optional[List[str]], Optional[int]]:
+    """
+    fields= -> (поля EngineOut в их порядке, images_limit по умолчанию).
+    "card"/"full" — пресеты, иначе список через запятую; product_id отдается всегда.
+    None в полях — все поля. Неизвестное поле -> ValueError.
+    """
+    if not value or not value.strip():
+        return None, None
+    value = value.strip()
+    if value in FIELD_PRESETS:
+        return FIELD_PRESETS[value]
+    requested = {f.strip() for f in value.split(",") if f.strip()}
+    unknown = requested - set(ENGINE_FIELD_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("product_id")
+    return [f for f in ENGINE_FIELD_NAMES if f in requested], None
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    # курсор непрозрачный для клиента, любой мусор -> ValueError
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict) or not isinstance(payload.get("k"), list):
+        raise ValueError("Invalid cursor")
+    return payload
+
+
+def _valid_sort_key(key: list, sort: str) -> bool:
+    # ключ уходит параметрами в WHERE: чужой тип или переполнение колонки — это 500 от драйвера, а не 400
+    types = SORT_KEY_TYPES[sort]
+    if len(key) != len(types):
+        return False
+    for value, kind in zip(key, types):
+        if kind is str:
+            if not isinstance(value, str) or "\x00" in value:
+                return False
+        elif isinstance(value, bool) or not isinstance(value, int) or not kind[0] <= value <= kind[1]:
+            return False
+    return True
 
 
 class EnginesService:
-    def _images_to_urls(self, engine) -> List[str]:
-        #engine.images -> ["url1", "url2", ...] + сортировка по sort_order (чтобы порядок был стабильным)
-        if not getattr(engine, "images", None):
-            return []
+    def __init__(self, cache_backend: Optional[CacheBackend] = None):
+        # в общем хранилище страница лежит json-строкой
+        self._cache = ReadThroughCache(
+            cache_backend,
+            dumps=EnginePage.model_dump_json,
+            loads=EnginePage.model_validate_json,
+        )
+        self._generation = None
 
-        # sort_order есть в БД, поэтому сортируем.
-        images_sorted = sorted(engine.images, key=lambda img: img.sort_order)
-        return [img.image_url for img in images_sorted]
+    def _to_out(self, e) -> EngineOut:
+        # строка из EngineDAO -> EngineOut; images уже список url по sort_order (собран в БД).
+        # model_construct без валидации: типы уже гарантирует схема БД.
+        # Колонок может быть меньше (fields=): недостающие поля остаются по умолчанию
+        values = e._asdict()
+        for extra in values.keys() - OUT_FIELDS:
+            del values[extra]
+        if "images" in values:
+            values["images"] = list(values["images"] or [])
+        return EngineOut.model_construct(**values)
 
     async def list_engines(self,
                            session: AsyncSession,
@@ -21,66 +110,209 @@ class EnginesService:
                            year: Optional[str] = None,
                            price_min: Optional[int] = None,
                            price_max: Optional[int] = None,
+                           year_min: Optional[int] = None,
+                           year_max: Optional[int] = None,
                            limit: int = 20,
                            offset: int = 0,
-                           ) -> List[EngineOut]:
+                           sort: str = "product_id",
+                           cursor: Optional[str] = None,
+                           images_limit: Optional[int] = None,
+                           fields: Optional[List[str]] = None,
+                           ) -> EnginePage:
+        """
+        Страница списка через read-through кэш. Ключ — нормализованные фильтры,
+        сортировка, пагинация, набор полей и поколение каталога: после импорта (bump поколения)
+        все старые страницы разом перестают находиться.
+        fields (см. parse_fields) — какие колонки читать; остальные поля EngineOut остаются пустыми.
+        """
+        # " Toyota " и "Toyota", "" и None — один и тот же запрос и один ключ
+        filters = normalize_filters(dict(make=make, model=model, year=year, price_min=price_min, price_max=price_max,
+                                         year_min=year_min, year_max=year_max))
+        params = dict(filters, limit=limit, offset=offset, sort=sort, cursor=cursor, images_limit=images_limit,
+                      fields=",".join(fields) if fields is not None else None)
+
+        generation = await catalog_service.generation(session)
+        if generation != self._generation:
+            # страницы прошлого поколения уже не найдутся по ключу, освобождаем память сразу
+            await self._cache.clear()
+            self._generation = generation
+        key = "engines:list:%s:%s" % (
+            generation,
+            json.dumps({k: v for k, v in params.items() if v is not None}, sort_keys=True, ensure_ascii=False),
+        )
+        return await self._cache.get_or_load(
+            key,
+            lambda: self._load_page(session, filters, limit, offset, sort, cursor, images_limit, fields),
+        )
+
+    async def _load_page(self,
+                         session: AsyncSession,
+                         filters: dict,
+                         limit: int,
+                         offset: int,
+                         sort: str,
+                         cursor: Optional[str],
+                         images_limit: Optional[int],
+                         fields: Optional[List[str]],
+                         ) -> EnginePage:
+        after = None
+        total, total_exact = None, True
+        if cursor:
+            payload = decode_cursor(cursor)
+            # курсор привязан к порядку сортировки, с другим sort он бессмыслен
+            if payload.get("s") != sort:
+                raise ValueError("Cursor does not match sort order")
+            if not _valid_sort_key(payload["k"], sort):
+                raise ValueError("Invalid cursor")
+            after = payload["k"]
+            # total посчитан на первой странице и едет в курсоре — повторно не считаем
+            if isinstance(payload.get("t"), int):
+                total, total_exact = payload["t"], bool(payload.get("x", True))
+        else:
+            # большой неселективный фильтр: точный count обойдется в полный проход,
+            # поэтому отдаем (закэшированную) оценку планировщика
+            estimate = await engine_dao.estimate_count(session=session, **filters)
+            if estimate is not None and estimate > EXACT_COUNT_THRESHOLD:
+                total, total_exact = estimate, False
 
-        engines = await engine_dao.list_engines(
+        count_total, engines = await engine_dao.list_engines(
             session=session,
-            make=make,
-            model=model,
-            year=year,
-            price_min=price_min,
-            price_max=price_max,
+            **filters,
             limit=limit,
             offset=offset,
+            sort=sort,
+            after=after,
+            with_total=not cursor and total is None,
+            images_limit=images_limit,
+            fields=fields,
         )
+        if count_total is not None:
+            total = count_total
 
-        # превращаем ORM -> EngineOut и добавляем images как urls
-        return [
-            EngineOut(
-                product_id=e.product_id,
-                title=e.title,
-                make=e.make,
-                model=e.model,
-                year=e.year,
-                engine_code=e.engine_code,
-                engine_type=e.engine_type,
-                price=e.price,
-                currency=e.currency,
-                stock_text=e.stock_text,
-                oem=e.oem,
-                description=e.description,
-                images=self._images_to_urls(e),
-            )
-            for e in engines
-        ]
+        next_cursor = None
+        if len(engines) == limit:
+            next_cursor = encode_cursor({
+                "s": sort,
+                "k": engine_dao.sort_key(sort, engines[-1]),
+                "t": total,
+                "x": total_exact,
+            })
+
+        items = [self._to_out(e) for e in engines]
+        return EnginePage(items=items, next_cursor=next_cursor, total=total, total_exact=total_exact)
 
     async def get_engine(
             self,
             session: AsyncSession,
             product_id: int,
+            fields: Optional[List[str]] = None,
     ) -> Optional[EngineOut]:
-        engine = await engine_dao.get_engine(session=session, product_id=product_id)
+        engine = await engine_dao.get_engine(session=session, product_id=product_id, fields=fields)
 
         if not engine:
             return None
 
-        return EngineOut(
-            product_id=engine.product_id,
-            title=engine.title,
-            make=engine.make,
-            model=engine.model,
-            year=engine.year,
-            engine_code=engine.engine_code,
-            engine_type=engine.engine_type,
-            price=engine.price,
-            currency=engine.currency,
-            stock_text=engine.stock_text,
-            oem=engine.oem,
-            description=engine.description,
-            images=self._images_to_urls(engine),
+        return self._to_out(engine)
+
+    async def get_engines(self,
+                          session: AsyncSession,
+                          product_ids: List[int],
+                          images_limit: Optional[int] = None,
+                          ) -> EngineBatchOut:
+        ids = list(dict.fromkeys(product_ids))
+        engines = await engine_dao.get_engines(session=session, product_ids=ids, images_limit=images_limit)
+        by_id = {e.product_id: e for e in engines}
+
+        out = EngineBatchOut()
+        for product_id in ids:
+            if product_id in by_id:
+                out.items.append(self._to_out(by_id[product_id]))
+            else:
+                out.missing.append(product_id)
+        return out
+
+    async def search_engines(self,
+                             session: AsyncSession,
+                             q: str,
+                             make: Optional[str] = None,
+                             model: Optional[str] = None,
+                             year: Optional[str] = None,
+                             price_min: Optional[int] = None,
+                             price_max: Optional[int] = None,
+                             year_min: Optional[int] = None,
+                             year_max: Optional[int] = None,
+                             limit: int = 20,
+                             offset: int = 0,
+                             images_limit: Optional[int] = None,
+                             ) -> EnginePage:
+        total, engines = await engine_dao.search_engines(
+            session=session,
+            q=q,
+            make=make,
+            model=model,
+            year=year,
+            price_min=price_min,
+            price_max=price_max,
+            year_min=year_min,
+            year_max=year_max,
+            limit=limit,
+            offset=offset,
+            images_limit=images_limit,
         )
+        return EnginePage(items=[self._to_out(e) for e in engines], total=total)
+
+    async def lookup(self,
+                     session: AsyncSession,
+                     codes: List[str],
+                     ) -> EngineLookupOut:
+        # разные написания одного кода ("19000-46150" и "1900046150") дают один ключ
+        keys = list(dict.fromkeys(k for k in map(normalize_code, codes) if k))
+
+        found = {}
+        for key, engine in await engine_dao.lookup_codes(session=session, keys=keys):
+            # совпасть и по OEM, и по коду двигателя товар может дважды — берем один раз
+            found.setdefault(key, {}).setdefault(engine.product_id, engine)
+
+        out = EngineLookupOut()
+        for code in dict.fromkeys(codes):
+            key = normalize_code(code)
+            if key in found:
+                out.results[code] = [self._to_out(e) for e in found[key].values()]
+            else:
+                out.missing.append(code)
+        return out
+
+
+    async def export_engines(self,
+                             fmt: str = "ndjson",
+                             **filters,
+                             ) -> AsyncIterator[bytes]:
+        """
+        Весь каталог (или его часть под фильтры) кусками байт: ndjson — объект на строку,
+        csv — заголовок EXPORT_FIELDS и строки. Своя сессия: генератор живет дольше запроса,
+        пока клиент читает ответ.
+        """
+        filters = normalize_filters(filters)
+        if fmt == "csv":
+            yield self._csv_chunk([EXPORT_FIELDS])
+        async with async_session() as session:
+            async for rows in engine_dao.stream_engines(session, EXPORT_BATCH, **filters):
+                if fmt == "csv":
+                    yield self._csv_chunk(
+                        [getattr(row, k) for k in EXPORT_ENGINE_FIELDS] + [EXPORT_IMAGES_SEPARATOR.join(row.images or [])]
+                        for row in rows
+                    )
+                else:
+                    yield "".join(
+                        json.dumps({**{k: getattr(row, k) for k in EXPORT_ENGINE_FIELDS}, "images": list(row.images or [])},
+                                   ensure_ascii=False) + "\n"
+                        for row in rows
+                    ).encode("utf-8")
+
+    def _csv_chunk(self, rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
 
 
-engines_service = EnginesService()
\ No newline at end of file
+engines_service = EnginesService(make_backend())
\ No newline at end of file
@@ -1,25 +1,166 @@
-from typing import List, Optional
+import asyncio
+import json
+from typing import Dict, List, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import CacheBackend, ReadThroughCache, make_backend
+from core.normalize import year_sort_key
 from dao.filters_dao import filters_dao
+from schemas.filters import FacetCountsOut
+from services.catalog_service import catalog_service
+
+
+class FacetIndex:
+    """
+    Дерево make -> model -> {year} в памяти процесса, собранное для одного поколения каталога.
+    После сборки не меняется: при новом поколении строится новый индекс и подменяет старый целиком.
+    """
+    def __init__(self,
+                 generation: int,
+                 rows: List[Tuple[Optional[str], Optional[str], Optional[str]]],
+                 ):
+        self.generation = generation
+        self.etag = f'"facets-{generation}"'
+        # None-ключи тоже храним: get_models() без make отдает модели и без марки
+        self.tree: Dict[Optional[str], Dict[Optional[str], Set[str]]] = {}
+        all_models: Set[Optional[str]] = set()
+        for make, model, year in rows:
+            years = self.tree.setdefault(make, {}).setdefault(model, set())
+            all_models.add(model)
+            if year:
+                years.add(year)
+        self._all_models = all_models
+        # мемо только для марок/моделей из индекса: ключи конечны, произвольные строки клиента память не растят
+        self._memo: Dict[tuple, List[str]] = {}
+
+    def _known(self, make: Optional[str] = None, model: Optional[str] = None) -> bool:
+        if make and make not in self.tree:
+            return False
+        if model:
+            return model in (self.tree[make] if make else self._all_models)
+        return True
+
+    def _cached(self, key: tuple, build) -> List[str]:
+        if not self._known(*key[1:]):
+            return []
+        result = self._memo.get(key)
+        if result is None:
+            result = self._memo[key] = build()
+        return result
+
+    def _models_of(self, make: Optional[str]) -> List[Dict[Optional[str], Set[str]]]:
+        if make:
+            return [self.tree[make]] if make in self.tree else []
+        return list(self.tree.values())
+
+    def makes(self) -> List[str]:
+        return self._cached(("makes",), lambda: sorted(m for m in self.tree if m))
+
+    def models(self, make: Optional[str] = None) -> List[str]:
+        return self._cached(
+            ("models", make or None),
+            lambda: sorted({m for models in self._models_of(make) for m in models if m}),
+        )
+
+    def years(self, make: Optional[str] = None, model: Optional[str] = None) -> List[str]:
+        def build():
+            years: Set[str] = set()
+            for models in self._models_of(make):
+                if model:
+                    years |= models.get(model, set())
+                else:
+                    for y in models.values():
+                        years |= y
+            return sorted(years, key=year_sort_key)
+
+        return self._cached(("years", make or None, model or None), build)
 
 
 class FiltersService:
+    def __init__(self, cache_backend: Optional[CacheBackend] = None):
+        self._index: Optional[FacetIndex] = None
+        self._lock = asyncio.Lock()
+        # счетчики фасетов по фильтрам: тот же read-through кэш, что у списков, ключ с поколением
+        self._counts_cache = ReadThroughCache(
+            cache_backend,
+            dumps=FacetCountsOut.model_dump_json,
+            loads=FacetCountsOut.model_validate_json,
+        )
+        self._counts_generation = None
+
+    async def refresh(self,
+                      session: AsyncSession,
+                      force: bool = False,
+                      ) -> FacetIndex:
+        # собираем новый индекс рядом и подменяем ссылку одним присваиванием
+        async with self._lock:
+            generation = await catalog_service.generation(session, force=force)
+            if self._index is None or self._index.generation != generation:
+                rows = await filters_dao.get_facet_rows(session)
+                self._index = FacetIndex(generation, rows)
+            return self._index
+
+    async def get_index(self,
+                        session: AsyncSession,
+                        ) -> FacetIndex:
+        # в БД идем только если индекса нет или поменялось поколение каталога
+        generation = await catalog_service.generation(session)
+        index = self._index
+        if index is None or index.generation != generation:
+            index = await self.refresh(session)
+        return index
+
     async def get_makes(self,
                         session: AsyncSession,
                         ) -> List[str]:
-        return await filters_dao.get_makes(session)
+        return (await self.get_index(session)).makes()
 
     async def get_models(self,
                          session: AsyncSession,
                          make: Optional[str] = None
                          ) -> List[str]:
-        return await filters_dao.get_models(session, make)
+        return (await self.get_index(session)).models(make)
 
     async def get_years(self,
                         session: AsyncSession,
                         make: Optional[str] = None,
                         model: Optional[str] = None
                         ) -> List[str]:
-        return await filters_dao.get_years(session, make, model)
+        return (await self.get_index(session)).years(make, model)
+
+    async def get_facet_counts(self,
+                               session: AsyncSession,
+                               **filters,
+                               ) -> FacetCountsOut:
+        # пустые строки и пробелы — то же, что отсутствие фильтра (как в EnginesService.list_engines)
+        filters = {
+            k: (v.strip() or None) if isinstance(v, str) else v
+            for k, v in filters.items()
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+
+        generation = await catalog_service.generation(session)
+        if generation != self._counts_generation:
+            await self._counts_cache.clear()
+            self._counts_generation = generation
+        key = "filters:facets:%s:%s" % (generation, json.dumps(filters, sort_keys=True, ensure_ascii=False))
+        return await self._counts_cache.get_or_load(key, lambda: self._load_counts(session, filters))
+
+    async def _load_counts(self,
+                           session: AsyncSession,
+                           filters: dict,
+                           ) -> FacetCountsOut:
+        total, counts = await filters_dao.get_facet_counts(session, **filters)
+        return FacetCountsOut(
+            total=total,
+            makes=[{"value": v, "count": c} for v, c in counts["make"]],
+            models=[{"value": v, "count": c} for v, c in counts["model"]],
+            years=[{"value": v, "count": c} for v, c in counts["year"]],
+        )
+
+    async def etag(self,
+                   session: AsyncSession,
+                   ) -> str:
+        # ответы /filters/* меняются только с поколением каталога
+        return f'"facets-{await catalog_service.generation(session)}"'
 
-filters_service = FiltersService()
+filters_service = FiltersService(make_backend())
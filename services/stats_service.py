@@ -0,0 +1,87 @@
+"""
+Сводка цен (/stats/prices) из таблицы price_stats. Пересчет при импорте делают
+load_csv.py и scraper/db_sink.py; полный пересчет вручную (например, после первого
+python -m db.schema на существующей базе):
+
+    python -m services.stats_service
+"""
+import asyncio
+import json
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dao.stats_dao import stats_dao, ANY, PRICE_BUCKET_EDGES, PRICE_PERCENTILES
+from db.models import PriceStat
+from schemas.stats import PriceBucket, PriceStatsOut
+
+
+def _buckets(counts: List[int]) -> List[PriceBucket]:
+    bounds = (0,) + PRICE_BUCKET_EDGES
+    uppers = PRICE_BUCKET_EDGES + (None,)
+    return [PriceBucket(price_from=lo, price_to=hi, count=c) for lo, hi, c in zip(bounds, uppers, counts)]
+
+
+def _key(value) -> Optional[str]:
+    return ANY if value is None or value == "" else str(value)
+
+
+class StatsService:
+    def _to_out(self, stat: PriceStat) -> PriceStatsOut:
+        return PriceStatsOut(
+            make=None if stat.make == ANY else stat.make,
+            model=None if stat.model == ANY else stat.model,
+            year=None if stat.year == ANY else int(stat.year),
+            count=stat.count,
+            min=stat.min_price,
+            max=stat.max_price,
+            avg=stat.avg_price,
+            percentiles={f"p{p}": getattr(stat, f"p{p}") for p in PRICE_PERCENTILES},
+            histogram=_buckets(json.loads(stat.histogram)),
+        )
+
+    async def get_prices(self,
+                         session: AsyncSession,
+                         make: Optional[str] = None,
+                         model: Optional[str] = None,
+                         year: Optional[int] = None,
+                         ) -> PriceStatsOut:
+        # одна строка по первичному ключу; нет строки — нет товаров с ценой под фильтр
+        stat = await stats_dao.get(session, _key(make), _key(model), _key(year))
+        if stat is None:
+            return PriceStatsOut(make=make or None, model=model or None, year=year,
+                                 histogram=_buckets([0] * (len(PRICE_BUCKET_EDGES) + 1)))
+        return self._to_out(stat)
+
+    async def get_breakdown(self,
+                            session: AsyncSession,
+                            by: str,
+                            make: Optional[str] = None,
+                            model: Optional[str] = None,
+                            year: Optional[int] = None,
+                            ) -> List[PriceStatsOut]:
+        stats = await stats_dao.breakdown(session, by, _key(make), _key(model), _key(year))
+        return [self._to_out(s) for s in stats]
+
+    async def rebuild(self,
+                      session: AsyncSession,
+                      makes: Optional[List[str]] = None,
+                      include_global: bool = True,
+                      ):
+        await stats_dao.rebuild(session, makes, include_global)
+
+
+stats_service = StatsService()
+
+
+async def main():
+    from db.database import engine, async_session
+
+    async with async_session() as session:
+        await stats_service.rebuild(session)
+        await session.commit()
+    await engine.dispose()
+    print("OK: price_stats rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Dict, Optional, get_args
+
+from sqlalchemy import text
+
+from core.config import CATALOG_SNAPSHOT, CREATE_SCHEMA_ON_STARTUP, WARMUP_CONNECTIONS, WARMUP_LISTINGS
+from dao.filters_dao import filters_dao
+from db.database import engine, async_session
+from schemas.engine import EngineSort
+from services.engines_service import engines_service
+from services.filters_service import filters_service
+
+
+class WarmupService:
+    """
+    Старт воркера: (опционально) схема, открытие соединений пула, прогрев фасетов
+    и популярных списков. Прогрев идет фоновой задачей (start): uvicorn уже принимает
+    запросы, но пока прогрев не закончен, /health/ready отвечает 503 —
+    балансировщик не пускает трафик на холодный воркер.
+    Прогретые списки живут CACHE_TTL (по умолчанию 30 с): они закрывают первые запросы
+    после старта, фасеты же держатся до смены поколения каталога.
+    """
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        # шаг -> сколько секунд занял, для /health/ready и логов
+        self.timings: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _step(self, name: str, coro):
+        started = time.perf_counter()
+        result = await coro
+        self.timings[name] = round(time.perf_counter() - started, 4)
+        return result
+
+    async def open_connections(self, count: int):
+        # держим count соединений одновременно, иначе пул выдаст одно и то же
+        pool_size = getattr(engine.sync_engine.pool, "size", lambda: count)()
+        count = min(count, pool_size)
+        if count <= 0:
+            return
+        release = asyncio.Event()
+        opened = []
+
+        async def hold():
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    opened.append(conn)
+                    if len(opened) == count:
+                        release.set()
+                    await release.wait()
+            finally:
+                # если одно соединение не открылось — не держим остальные вечно
+                release.set()
+
+        await asyncio.gather(*[hold() for _ in range(count)])
+
+    async def prime_listings(self, makes_count: int):
+        # первые страницы с параметрами по умолчанию — ровно те ключи, что спросят клиенты
+        if makes_count <= 0:
+            return
+        async with async_session() as session:
+            makes = await filters_dao.get_top_makes(session, limit=makes_count)
+            for sort in get_args(EngineSort):
+                await engines_service.list_engines(session=session, sort=sort)
+            for make in makes:
+                await engines_service.list_engines(session=session, make=make)
+
+    async def prime_facets(self):
+        async with async_session() as session:
+            await filters_service.refresh(session, force=True)
+
+    async def run(self):
+        started = time.perf_counter()
+        # снимок read-only и уже со схемой
+        if CREATE_SCHEMA_ON_STARTUP and not CATALOG_SNAPSHOT:
+            from db.schema import create_schema
+            await self._step("schema", create_schema())
+        await self._step("connections", self.open_connections(WARMUP_CONNECTIONS))
+        await self._step("facets", self.prime_facets())
+        await self._step("listings", self.prime_listings(WARMUP_LISTINGS))
+        self.timings["total"] = round(time.perf_counter() - started, 4)
+        self.ready = True
+        print("Warm-up done:", ", ".join(f"{k} {v:.3f}s" for k, v in self.timings.items()))
+
+    async def _run_logged(self):
+        try:
+            await self.run()
+        except Exception as e:
+            # воркер остается not ready (503 с причиной), а не падает молча в фоне
+            self.error = repr(e)
+            print(f"Warm-up failed: {e!r}")
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_logged())
+        return self._task
+
+    async def wait(self):
+        # для скриптов и бенчмарков: дождаться конца прогрева
+        await self.start()
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+warmup_service = WarmupService()
@@ -1,12 +1,16 @@
-from sqlalchemy.orm import session
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import Engine
-
+import asyncio
 
+from db.database import async_session
 from dao.engines_dao import EngineDAO
 dao = EngineDAO()
 
-total, items = await dao.list_engines(session, make="Volvo", limit=5, offset=0)
-print(total, len(items))
-print(items[0].product_id, len(items[0].images))
+
+async def main():
+    async with async_session() as session:
+        total, items = await dao.list_engines(session, make="Volvo", limit=5, offset=0)
+        print(total, len(items))
+        if items:
+            print(items[0].product_id, len(items[0].images))
+
+if __name__ == "__main__":
+    asyncio.run(main())